@@ -0,0 +1,83 @@
+# cogs/_answer_cache.py
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def normalize_question(text: str) -> str:
+    """
+    質問文をキャッシュのキーに正規化する。
+
+    NFKC で全角・半角をそろえ、小文字化し、空白・句読点・記号を取り除く。
+    例: 「極ゴルベーザの攻略を教えて？」と「極ゴルベーザの 攻略を教えて」は同じキーになる。
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(
+        char for char in text
+        if not char.isspace() and unicodedata.category(char)[0] not in ("P", "S")
+    )
+
+
+class AnswerCache:
+    """
+    正規化した質問文 → 回答の、有効期限と件数上限つきキャッシュ。
+
+    件数が上限を超えた場合は最も長く使われていないものから捨てる（LRU）。
+    """
+
+    def __init__(self, max_entries: int = 500, ttl: float = 6 * 3600, max_question_chars: int = 200):
+        """
+        Args:
+            max_entries: 保持する回答の最大件数
+            ttl: 回答の有効期限（秒）
+            max_question_chars: キャッシュ対象にする質問の最大文字数
+        """
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl = max(float(ttl), 0)
+        self.max_question_chars = max(int(max_question_chars), 1)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, question: str) -> Optional[str]:
+        """キャッシュのキー。長すぎる質問・正規化して空になる質問は対象外（None）。"""
+        if len(question) > self.max_question_chars:
+            return None
+        return normalize_question(question) or None
+
+    def get(self, question: str) -> Optional[str]:
+        key = self.key(question)
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, question: str, answer: str):
+        key = self.key(question)
+        if key is None or not answer:
+            return
+        self._entries[key] = (answer, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,264 @@
+# cogs/_browser_pool.py
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright, Route
+
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-gpu'
+]
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# スクレイピングに不要なリソース（帯域と描画時間の大半を占める）
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_URL_PATTERN = re.compile(
+    r"(google-analytics\.com|googletagmanager\.com|doubleclick\.net"
+    r"|ads-twitter\.com|analytics\.twitter\.com|static\.ads-twitter\.com"
+    r"|/jot/|/1\.1/jot|client_event|/i/api/1\.1/live_pipeline"
+    r"|video\.twimg\.com|\.(?:png|jpe?g|gif|webp|mp4|m3u8|woff2?|ttf)(?:\?|$))"
+)
+
+
+class StageTimer:
+    """スクレイピングの段階ごとの所要時間を記録するクラス。"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def mark(self, stage: str):
+        """前回の mark からの経過時間を stage に加算する。"""
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self._started
+        stages = " ".join(f"{name}={sec:.2f}s" for name, sec in self._stages.items())
+        return f"[timing] {self.label}: total={total:.2f}s {stages}"
+
+
+def _descendant_rss_bytes() -> Optional[int]:
+    """
+    このプロセスの子孫プロセス（Playwrightドライバ・Chromium）のRSS合計を返す。
+    /proc が無い環境では None。
+    """
+    if not os.path.isdir("/proc"):
+        return None
+
+    parents: dict[int, int] = {}
+    rss_pages: dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # comm に空白が含まれる場合があるため、最後の ')' 以降を分割する
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+            rss_pages[int(entry)] = int(fields[21])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    root = os.getpid()
+    total = 0
+    for pid in parents:
+        current = pid
+        while current in parents and current != root:
+            current = parents[current]
+        if current == root and pid != root:
+            total += rss_pages.get(pid, 0)
+    return total * os.sysconf("SC_PAGE_SIZE")
+
+
+class BrowserPool:
+    """
+    Cogが所有する常駐ヘッドレスChromium。
+
+    取得処理ごとに新しい BrowserContext を貸し出し、ブラウザ本体は使い回す。
+    一定回数使用した場合・メモリ使用量が上限を超えた場合・クラッシュした場合は
+    次回の貸し出し時に再起動する。
+    """
+
+    def __init__(self, max_uses: int = 50, max_rss_mb: float = 800):
+        """
+        Args:
+            max_uses: ブラウザを再起動するまでの貸し出し回数
+            max_rss_mb: ブラウザ関連プロセスのRSS上限（MB）
+        """
+        self.max_uses = max(int(max_uses), 1)
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024)
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._lock = asyncio.Lock()
+        self._uses = 0
+        self._active = 0
+        self._closed = False
+        # 貸し出し中のため再起動を見送った理由（全て返却された後の貸し出しで再起動する）
+        self._recycle_reason: Optional[str] = None
+
+        # 統計（!X系の調査用）
+        self.launch_count = 0
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def _launch(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=CHROMIUM_ARGS
+        )
+        self._browser.on("disconnected", self._on_disconnected)
+        self._uses = 0
+        self._recycle_reason = None
+        self.launch_count += 1
+        print(f"[browser] Chromiumを起動しました (累計{self.launch_count}回)")
+
+    def _on_disconnected(self, browser: Browser):
+        if browser is self._browser:
+            print("[browser] Chromiumが切断されました。次回の取得時に再起動します")
+            self._browser = None
+
+    async def _close_browser(self):
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"[browser] ブラウザ終了エラー: {e}")
+
+    def _needs_recycle(self) -> Optional[str]:
+        if self._recycle_reason:
+            return self._recycle_reason
+        if self._uses >= self.max_uses:
+            return f"使用回数 {self._uses}回"
+        rss = _descendant_rss_bytes()
+        if rss is not None and rss > self.max_rss_bytes:
+            return f"RSS {rss / 1024 / 1024:.0f}MB"
+        return None
+
+    async def _acquire_browser(self) -> Browser:
+        async with self._lock:
+            if self._closed:
+                raise RuntimeError("BrowserPool は既に終了しています")
+
+            if self._browser is not None and not self._browser.is_connected():
+                self._browser = None
+
+            # 貸し出し中のコンテキストがある間は再起動しない
+            if self._browser is not None and self._active == 0:
+                reason = self._needs_recycle()
+                if reason:
+                    print(f"[browser] Chromiumを再起動します ({reason})")
+                    await self._close_browser()
+
+            if self._browser is None:
+                await self._launch()
+
+            self._uses += 1
+            self._active += 1
+            return self._browser
+
+    @staticmethod
+    async def _block_resources(context: BrowserContext, stats: dict):
+        """画像・動画・フォント・計測系のリクエストを中断するルートを登録する。"""
+
+        async def handle(route: Route):
+            request = route.request
+            if (
+                request.resource_type in BLOCKED_RESOURCE_TYPES
+                or BLOCKED_URL_PATTERN.search(request.url)
+            ):
+                stats["blocked"] += 1
+                await route.abort()
+            else:
+                stats["allowed"] += 1
+                await route.continue_()
+
+        await context.route("**/*", handle)
+
+    @asynccontextmanager
+    async def lease(self, block_resources: bool = True, **context_options):
+        """
+        新しい BrowserContext を貸し出す。ブロックを抜けるとコンテキストは閉じられる。
+
+        Args:
+            block_resources: True の場合、画像・動画・フォント・計測系の通信を遮断する
+            context_options: browser.new_context() に渡す引数
+
+        使い方:
+            async with pool.lease(viewport=...) as context:
+                page = await context.new_page()
+        """
+        context_options.setdefault("user_agent", DEFAULT_USER_AGENT)
+        browser = await self._acquire_browser()
+        context: Optional[BrowserContext] = None
+        stats = {"blocked": 0, "allowed": 0}
+        try:
+            try:
+                context = await browser.new_context(**context_options)
+            except Exception as e:
+                # クラッシュ直後などはコンテキスト作成に失敗するため、1回だけ再起動して再試行。
+                # ただし他の取得処理が使用中のブラウザは閉じず、返却後に再起動する
+                async with self._lock:
+                    if self._browser is browser:
+                        if browser.is_connected() and self._active > 1:
+                            print(f"[browser] コンテキスト作成エラー、使用中のため返却後に再起動します: {e}")
+                            self._recycle_reason = "コンテキスト作成エラー"
+                        else:
+                            print(f"[browser] コンテキスト作成エラー、再起動します: {e}")
+                            await self._close_browser()
+                    if self._browser is None:
+                        await self._launch()
+                        # 再起動で使用回数が0に戻るため、この貸し出しを数え直す
+                        self._uses += 1
+                    browser = self._browser
+                context = await browser.new_context(**context_options)
+            if block_resources:
+                await self._block_resources(context, stats)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+                if block_resources:
+                    print(
+                        f"[browser] リクエスト: 許可 {stats['allowed']}件 / "
+                        f"遮断 {stats['blocked']}件"
+                    )
+            # ロックは取らない: 減らすだけの同期的な1文のため、ロック内の判断の途中に割り込むことはなく、
+            # 判断後に減っても「使用中なら再起動しない」側に倒れるだけで安全。
+            # また、キャンセル中にロック待ちで中断されて _active が減らないままになるのを防ぐ
+            self._active -= 1
+
+    async def close(self):
+        """ブラウザとPlaywrightを終了する。"""
+        async with self._lock:
+            self._closed = True
+            await self._close_browser()
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception as e:
+                    print(f"[browser] Playwright終了エラー: {e}")
+                self._playwright = None
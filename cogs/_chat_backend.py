@@ -0,0 +1,231 @@
+# cogs/_chat_backend.py
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import random
+from typing import Any, Dict, List, Optional
+from google import genai
+from google.genai import types
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+
+class ChatBackend(ABC):
+    """
+    AIフリートークが使うチャット実装の共通インターフェース。
+
+    create_chat() が返すチャットは、Gemini の非同期チャットと同じく
+    send_message_stream(message) と get_history(curated=True) を持つこと。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def create_chat(
+        self,
+        system_instruction: str,
+        tools: Optional[List[types.Tool]] = None,
+        history: Optional[List[types.Content]] = None,
+    ) -> Any:
+        """新しいチャットを作る。"""
+
+    @abstractmethod
+    async def summarize(self, prompt: str) -> str:
+        """会話履歴の要約など、チャットとは別の1回きりの生成を行う。"""
+
+    @abstractmethod
+    async def search(self, query: str) -> str:
+        """Web 検索を使った1回きりの生成を行い、調べた内容を返す。"""
+
+    def reset(self):
+        """次のチャット作成から新しい接続を使う（進行中のチャットはそのまま）。"""
+
+    async def close(self):
+        """接続を閉じる。"""
+
+
+class GeminiBackend(ChatBackend):
+    """Google Gemini の非同期クライアントを使う実装"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = GEMINI_MODEL):
+        if not api_key:
+            raise KeyError("AI_API_KEY が環境変数に設定されていません（.env を確認してください）")
+        self.api_key = api_key
+        self.model = model
+        self._client: Optional[genai.Client] = None
+
+    def _ensure_client(self) -> genai.Client:
+        """クライアントが閉じていれば再生成して返す。"""
+        if self._client is None:
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def create_chat(self, system_instruction, tools=None, history=None):
+        config_params = {
+            "system_instruction": system_instruction,
+            "max_output_tokens": 2000,
+            "top_k": 2,
+            "top_p": 0.5,
+            "temperature": 0.5
+        }
+        if tools:
+            config_params["tools"] = tools
+
+        # 非同期クライアントのチャット（応答待ちの間も event loop を止めない）
+        return self._ensure_client().aio.chats.create(
+            model=self.model,
+            config=types.GenerateContentConfig(**config_params),
+            history=history
+        )
+
+    async def summarize(self, prompt: str) -> str:
+        response = await self._ensure_client().aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(max_output_tokens=1024, temperature=0.2)
+        )
+        return response.text
+
+    async def search(self, query: str) -> str:
+        # 関数呼び出しを使うチャットからも検索できるよう、検索は別リクエストで行う
+        response = await self._ensure_client().aio.models.generate_content(
+            model=self.model,
+            contents=query,
+            config=types.GenerateContentConfig(
+                tools=[types.Tool(google_search=types.GoogleSearch())],
+                max_output_tokens=1024,
+                temperature=0.2,
+            )
+        )
+        return response.text
+
+    def reset(self):
+        # 応答待ちのチャットが残っている場合に備え、古いクライアントは閉じない
+        self._client = None
+
+    async def close(self):
+        client, self._client = self._client, None
+        if client is not None and hasattr(client.aio, "aclose"):
+            try:
+                await client.aio.aclose()
+            except Exception as e:
+                print(f"❌ AIクライアント終了エラー: {e}")
+
+
+class FakeChunk:
+    """Gemini のストリーミング応答チャンクのうち、FreeTalk が使う属性だけを持つもの"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.function_calls = None
+        self.usage_metadata = None
+
+
+class FakeChat:
+    """遅延・分割送信・失敗を再現する、API を呼ばないチャット"""
+
+    def __init__(self, backend: "FakeBackend", history: Optional[List[types.Content]] = None):
+        self.backend = backend
+        self._history: List[types.Content] = list(history or [])
+
+    def get_history(self, curated: bool = False) -> List[types.Content]:
+        return list(self._history)
+
+    async def send_message_stream(self, message):
+        backend = self.backend
+        backend.requests += 1
+        await asyncio.sleep(backend._jittered(backend.latency))
+        if backend.random.random() < backend.failure_rate:
+            backend.failures += 1
+            raise RuntimeError("fake backend: simulated failure")
+
+        text = backend.reply_text(message if isinstance(message, str) else "")
+        size = max(len(text) // backend.chunks, 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+
+        async def stream():
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(backend._jittered(1 / backend.chunk_rate))
+                yield FakeChunk(piece)
+            self._history += [
+                types.Content(role="user", parts=[types.Part(text=str(message))]),
+                types.Content(role="model", parts=[types.Part(text=text)]),
+            ]
+
+        return stream()
+
+
+class FakeBackend(ChatBackend):
+    """
+    負荷試験用の、API を呼ばないチャット実装。
+
+    最初のチャンクまで latency 秒待ち、その後 chunk_rate 個/秒で
+    chunks 個に分けた応答を返す。failure_rate の割合で例外を投げる。
+    待ち時間には ±jitter の割合でばらつきを加える。
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        chunks: int = 10,
+        chunk_rate: float = 20.0,
+        failure_rate: float = 0.0,
+        reply_chars: int = 300,
+        jitter: float = 0.2,
+        seed: Optional[int] = None,
+    ):
+        self.latency = max(float(latency), 0.0)
+        self.chunks = max(int(chunks), 1)
+        self.chunk_rate = max(float(chunk_rate), 0.1)
+        self.failure_rate = min(max(float(failure_rate), 0.0), 1.0)
+        self.reply_chars = max(int(reply_chars), 1)
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+        self.random = random.Random(seed)
+
+        # 統計
+        self.requests = 0
+        self.failures = 0
+
+    def _jittered(self, seconds: float) -> float:
+        return max(seconds * (1 + self.random.uniform(-self.jitter, self.jitter)), 0.0)
+
+    def reply_text(self, message: str) -> str:
+        """reply_chars 文字程度の応答文（先頭に質問の一部を含める）"""
+        head = f"（テスト応答）{message[:50]} "
+        filler = "これは負荷試験用の応答です。"
+        body = filler * (self.reply_chars // len(filler) + 1)
+        return (head + body)[: max(self.reply_chars, len(head))]
+
+    def create_chat(self, system_instruction, tools=None, history=None):
+        return FakeChat(self, history)
+
+    async def summarize(self, prompt: str) -> str:
+        await asyncio.sleep(self._jittered(self.latency))
+        return "（テスト用の要約）"
+
+    async def search(self, query: str) -> str:
+        await asyncio.sleep(self._jittered(self.latency))
+        return f"（テスト用の検索結果）{query[:50]}"
+
+
+def create_backend(config: Dict) -> ChatBackend:
+    """
+    設定の FREETALK_BACKEND（"gemini" または "fake"）に応じた実装を返す。
+    fake の動作は FREETALK_FAKE_* で調整する。
+    """
+    name = config.get("FREETALK_BACKEND", "gemini")
+    if name == "fake":
+        return FakeBackend(
+            latency=float(config.get("FREETALK_FAKE_LATENCY_SECONDS", 1.0)),
+            chunks=int(config.get("FREETALK_FAKE_CHUNKS", 10)),
+            chunk_rate=float(config.get("FREETALK_FAKE_CHUNK_RATE", 20)),
+            failure_rate=float(config.get("FREETALK_FAKE_FAILURE_RATE", 0.0)),
+        )
+    if name != "gemini":
+        raise ValueError(f"不明な FREETALK_BACKEND です: {name}")
+    return GeminiBackend(os.environ.get("AI_API_KEY", ""))
@@ -0,0 +1,151 @@
+# cogs/_chat_context.py
+import asyncio
+from typing import Any, Callable, Dict, List
+from google.genai import types
+from cogs._chat_sessions import ChatSession
+
+SUMMARY_PROMPT = (
+    "以下はDiscord上の会話の前半部分です。後で会話を続けるために必要な情報"
+    "（話題、ユーザーが伝えた事実や好み、決まったこと、未解決の質問）を中心に、"
+    "{max_chars}文字以内の日本語で簡潔に要約してください。要約だけを出力してください。\n\n"
+    "{transcript}"
+)
+SUMMARY_PREFIX = "（これまでの会話の要約）\n"
+SUMMARY_ACK = "了解しました。要約の内容を踏まえて会話を続けます。"
+
+
+def estimate_tokens(history: List[types.Content]) -> int:
+    """
+    履歴のおおよそのトークン数。
+    英数字は約4文字で1トークン、日本語などは1文字1トークンとして数える。
+    """
+    total = 0
+    for content in history:
+        for part in content.parts or []:
+            text = part.text or ""
+            ascii_chars = sum(1 for char in text if char.isascii())
+            total += ascii_chars // 4 + (len(text) - ascii_chars)
+    return total
+
+
+def _transcript(history: List[types.Content]) -> str:
+    lines = []
+    for content in history:
+        text = "".join(part.text or "" for part in content.parts or [])
+        if text:
+            speaker = "ユーザー" if content.role == "user" else "AI"
+            lines.append(f"{speaker}: {text}")
+    return "\n".join(lines)
+
+
+class ContextCompactor:
+    """
+    会話セッションの履歴を一定の大きさに保つクラス。
+
+    セッションのトークン数が budget を超えたら、直近 keep_turns 往復を残して
+    それより前の履歴を要約し、「要約 + 直近の履歴」で作り直したチャットに差し替える。
+    要約はバックグラウンドで行うため、ユーザーへの応答は待たされない。
+    要約中に進んだ発言は、差し替え時に直近の履歴としてそのまま引き継ぐ。
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str], Any],
+        rebuild: Callable[[str, List[types.Content]], Any],
+        budget_tokens: int = 6000,
+        keep_turns: int = 6,
+        summary_chars: int = 800,
+    ):
+        """
+        Args:
+            summarize: プロンプトを受け取り、要約文を返すコルーチン関数
+            rebuild: (性格モード, 履歴) から新しいチャットを作る関数
+            budget_tokens: 要約を始めるトークン数
+            keep_turns: 要約せずにそのまま残す直近の往復数
+            summary_chars: 要約の最大文字数
+        """
+        self.summarize = summarize
+        self.rebuild = rebuild
+        self.budget_tokens = max(int(budget_tokens), 100)
+        self.keep_turns = max(int(keep_turns), 1)
+        self.summary_chars = max(int(summary_chars), 100)
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+
+        # 統計
+        self.compactions = 0
+        self.failures = 0
+
+    def needs_compaction(self, session: ChatSession) -> bool:
+        return (
+            session.context_tokens > self.budget_tokens
+            and len(session.chat.get_history(curated=True)) > self.keep_turns * 2
+        )
+
+    def maybe_schedule(self, session: ChatSession):
+        """予算を超えていれば、そのセッションの要約をバックグラウンドで開始する。"""
+        self._tasks = {key: task for key, task in self._tasks.items() if not task.done()}
+        if session.key in self._tasks:
+            return
+        if not self.needs_compaction(session):
+            return
+        self._tasks[session.key] = asyncio.create_task(self._compact(session))
+
+    def _split_index(self, history: List[types.Content]) -> int:
+        """直近 keep_turns 往復の開始位置（ユーザーの発言から始まる位置）を返す。"""
+        index = max(len(history) - self.keep_turns * 2, 0)
+        # 関数呼び出しの結果（role は user）は呼び出しと切り離さない
+        while index > 0 and (
+            history[index].role != "user"
+            or any(part.function_response for part in history[index].parts or [])
+        ):
+            index -= 1
+        return index
+
+    async def _compact(self, session: ChatSession):
+        history = session.chat.get_history(curated=True)
+        split = self._split_index(history)
+        if split <= 0:
+            return
+
+        prompt = SUMMARY_PROMPT.format(
+            max_chars=self.summary_chars, transcript=_transcript(history[:split])
+        )
+        try:
+            summary = (await self.summarize(prompt) or "").strip()
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ 会話の要約エラー {session.key}: {e}")
+            return
+        if not summary:
+            self.failures += 1
+            return
+
+        # 差し替えは発言の合間に行う（要約中に増えた履歴はそのまま残す）
+        async with session.lock:
+            current = session.chat.get_history(curated=True)
+            new_history = [
+                types.Content(role="user", parts=[types.Part(text=SUMMARY_PREFIX + summary)]),
+                types.Content(role="model", parts=[types.Part(text=SUMMARY_ACK)]),
+            ] + current[split:]
+            session.chat = self.rebuild(session.mode, new_history)
+            session.summary = summary
+            before = session.context_tokens
+            session.context_tokens = estimate_tokens(new_history)
+
+        self.compactions += 1
+        print(
+            f"🗜️ 会話を要約しました {session.key}: "
+            f"約{before}→{session.context_tokens}トークン (直近{len(current) - split}件を保持)"
+        )
+
+    async def close(self):
+        """実行中の要約を中断する。"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def pending(self) -> int:
+        """実行中の要約の数"""
+        return sum(1 for task in self._tasks.values() if not task.done())
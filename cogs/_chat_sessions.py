@@ -0,0 +1,157 @@
+# cogs/_chat_sessions.py
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+# (チャンネルIDまたはユーザーID, 性格モード)
+SessionKey = Tuple[Hashable, str]
+
+
+class ChatSession:
+    """会話1つ分のチャットと、その会話の発言を順番に処理するためのロック。"""
+
+    def __init__(self, key: SessionKey, chat: Any):
+        self.key = key
+        self.chat = chat
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.turns = 0
+        # 処理中・順番待ちの発言数
+        self.pending = 0
+        # 直近の応答時点の履歴のトークン数と、要約済みの場合はその内容
+        self.context_tokens = 0
+        self.summary: Optional[str] = None
+
+    @property
+    def mode(self) -> str:
+        return self.key[1]
+
+    @property
+    def busy(self) -> bool:
+        """発言を処理中、または順番待ちの発言がある"""
+        return self.pending > 0
+
+
+class ChatSessionManager:
+    """
+    会話セッションを (チャンネル/ユーザー, 性格) ごとに管理するクラス。
+
+    セッションは初回の発言時に作成し、idle_ttl 秒使われなければ破棄する。
+    同時に保持する数が max_sessions を超えた場合は、最も長く使われていない
+    セッションから破棄する（LRU）。処理中・順番待ちのセッションは破棄しない。
+    同じセッション内の発言は1つずつ順番に、別のセッションは並行して処理される。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        max_sessions: int = 200,
+        idle_ttl: float = 1800,
+    ):
+        """
+        Args:
+            factory: 性格モードを受け取り、新しいチャットを返す関数
+            max_sessions: 同時に保持するセッションの上限
+            idle_ttl: 未使用のセッションを破棄するまでの秒数
+        """
+        self.factory = factory
+        self.max_sessions = max(int(max_sessions), 1)
+        self.idle_ttl = max(float(idle_ttl), 0)
+        self._sessions: "OrderedDict[SessionKey, ChatSession]" = OrderedDict()
+
+        # 統計
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """idle_ttl を過ぎたセッションを破棄し、破棄した数を返す。"""
+        now = now or time.monotonic()
+        expired = []
+        # 使用順に並んでいるため、処理中のものを飛ばしつつ先頭から期限切れでなくなるまで見ればよい
+        for key, session in self._sessions.items():
+            if session.busy:
+                continue
+            if now - session.last_used < self.idle_ttl:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._sessions[key]
+        self.expired += len(expired)
+        return len(expired)
+
+    def _evict(self, keep: SessionKey):
+        """上限を超えた分を、処理中でない最も古いセッションから破棄する。"""
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow <= 0:
+            return
+        # 全て処理中なら一時的に上限を超えて保持し、次の作成時に改めて破棄する
+        idle = [
+            key for key, session in self._sessions.items()
+            if key != keep and not session.busy
+        ][:overflow]
+        for key in idle:
+            del self._sessions[key]
+        self.evicted += len(idle)
+
+    def _touch(self, session: ChatSession):
+        """使用時刻を更新し、LRU の末尾へ移す（破棄済みのセッションは戻さない）。"""
+        session.last_used = time.monotonic()
+        if self._sessions.get(session.key) is session:
+            self._sessions.move_to_end(session.key)
+
+    def peek(self, key: SessionKey) -> Optional[ChatSession]:
+        """セッションがあれば返す（作成も使用時刻の更新もしない）。"""
+        return self._sessions.get(key)
+
+    def get(self, key: SessionKey) -> ChatSession:
+        """セッションを返す。無ければ作成し、上限を超えた分は古いものから破棄する。"""
+        self.prune()
+        session = self._sessions.get(key)
+        if session is None:
+            session = ChatSession(key, self.factory(key[1]))
+            self._sessions[key] = session
+            self.created += 1
+            self._evict(keep=key)
+        self._touch(session)
+        return session
+
+    @asynccontextmanager
+    async def turn(self, key: SessionKey):
+        """
+        セッションの発言順を確保する。同じセッションへの発言は前の発言の完了を待つ。
+
+        使い方:
+            async with manager.turn((channel_id, "normal")) as session:
+                await session.chat.send_message(...)
+        """
+        session = self.get(key)
+        session.pending += 1
+        try:
+            async with session.lock:
+                self._touch(session)
+                try:
+                    yield session
+                finally:
+                    session.turns += 1
+                    self._touch(session)
+        finally:
+            session.pending -= 1
+
+    def reset(self, mode: Optional[str] = None) -> int:
+        """
+        セッションを破棄し、破棄した数を返す。
+
+        Args:
+            mode: 指定した性格のセッションだけを破棄する（省略時は全て）
+        """
+        keys = [key for key in self._sessions if mode is None or key[1] == mode]
+        for key in keys:
+            del self._sessions[key]
+        return len(keys)
@@ -0,0 +1,233 @@
+# cogs/_chat_tools.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from discord.ext import commands
+from google.genai import types
+from cogs.base_cog import BaseCog
+from cogs._lodestone_client import LodestoneError
+
+# AIに返すマーケットの出品数の上限
+MAX_LISTINGS = 10
+# 部分一致で返す候補数の上限
+MAX_CANDIDATES = 10
+
+TOOL_INSTRUCTION = (
+    "アイテムの価格やマーケットの出品状況、キャラクターの検索について聞かれた場合は、"
+    "推測せずに用意された関数を呼び出し、その結果だけをもとに答えること。"
+)
+
+SEARCH_INSTRUCTION = (
+    "それ以外で攻略情報や最新の情報が必要な場合は、web_search 関数で調べてから答えること。"
+)
+
+FIND_ITEM = types.FunctionDeclaration(
+    name="find_item",
+    description="FF14の取引可能アイテムを名前（日本語または英語、部分一致可）で検索し、アイテムIDと正式名を返す。",
+    parameters=types.Schema(
+        type="OBJECT",
+        properties={
+            "name": types.Schema(type="STRING", description="アイテム名（例: アイスシャード, Ice Shard）"),
+        },
+        required=["name"],
+    ),
+)
+
+GET_MARKET_PRICES = types.FunctionDeclaration(
+    name="get_market_prices",
+    description=(
+        "FF14のマーケットボード（Universalis）から、アイテムの現在の出品を安い順に返す。"
+        "ワールドまたはデータセンターを省略すると日本の全ワールドが対象。"
+    ),
+    parameters=types.Schema(
+        type="OBJECT",
+        properties={
+            "item_name": types.Schema(type="STRING", description="アイテム名（日本語または英語）"),
+            "location": types.Schema(
+                type="STRING",
+                description="ワールド名（例: Atomos）またはデータセンター名（Elemental, Gaia, Mana, Meteor）",
+            ),
+        },
+        required=["item_name"],
+    ),
+)
+
+SEARCH_CHARACTER = types.FunctionDeclaration(
+    name="search_character",
+    description="Lodestoneで日本のワールドのキャラクターを名前で検索し、キャラクターページのURLを返す。",
+    parameters=types.Schema(
+        type="OBJECT",
+        properties={
+            "name": types.Schema(type="STRING", description="キャラクターのフルネーム（例: Trunks Vegeta）"),
+            "world": types.Schema(type="STRING", description="ワールド名（例: Atomos）"),
+        },
+        required=["name", "world"],
+    ),
+)
+
+
+WEB_SEARCH = types.FunctionDeclaration(
+    name="web_search",
+    description="FF14の攻略情報やニュースなど、Bot内のデータに無い情報をGoogle検索で調べ、要点を返す。",
+    parameters=types.Schema(
+        type="OBJECT",
+        properties={
+            "query": types.Schema(type="STRING", description="調べたい内容（例: 極ゴルベーザ 攻略）"),
+        },
+        required=["query"],
+    ),
+)
+
+# 結果がその時点のデータに依存する関数（回答をキャッシュしない）
+LIVE_DATA_FUNCTIONS = {"find_item", "get_market_prices", "search_character"}
+
+
+class ChatTools:
+    """
+    AIチャットから呼び出せる関数（function calling）を、Bot内のデータで実行するクラス。
+
+    アイテム検索と価格は ItemCog のカタログとマーケット取得処理を、
+    キャラクター検索は BaseCog.lodestone_search を使う。対応するCogが
+    読み込まれていない関数は公開しない。
+
+    Gemini は関数呼び出しと Google 検索を同じリクエストで併用できないため、
+    検索付きの性格には Web 検索も関数（web_search）として渡し、search で
+    別リクエストとして実行する。
+    """
+
+    def __init__(self, bot: commands.Bot, search: Optional[Callable[[str], Awaitable[str]]] = None):
+        self.bot = bot
+        self.search = search
+
+        # 統計
+        self.calls: Dict[str, int] = {}
+        self.failures = 0
+
+    def _item_cog(self):
+        return self.bot.get_cog("ItemCog") if self.bot else None
+
+    def _lodestone_cog(self) -> Optional[BaseCog]:
+        if not self.bot:
+            return None
+        return next((cog for cog in self.bot.cogs.values() if isinstance(cog, BaseCog)), None)
+
+    def declarations(self, web_search: bool = False) -> List[types.FunctionDeclaration]:
+        """
+        現在呼び出せる関数の定義一覧。Bot 内のデータを使う関数が1つも無ければ空。
+
+        Args:
+            web_search: Web 検索の関数も含める
+        """
+        declarations = []
+        if self._item_cog() is not None:
+            declarations += [FIND_ITEM, GET_MARKET_PRICES]
+        if self._lodestone_cog() is not None:
+            declarations.append(SEARCH_CHARACTER)
+        if declarations and web_search and self.search is not None:
+            declarations.append(WEB_SEARCH)
+        return declarations
+
+    async def call(self, name: str, args: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """関数を実行し、AIに返す結果を辞書で返す。失敗時は error を含む辞書を返す。"""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        handler = {
+            "find_item": self._find_item,
+            "get_market_prices": self._get_market_prices,
+            "search_character": self._search_character,
+            "web_search": self._web_search,
+        }.get(name)
+        if handler is None or name not in {declaration.name for declaration in self.declarations(web_search=True)}:
+            # Cogがアンロードされた後に、古い定義のまま呼ばれた場合も含む
+            self.failures += 1
+            return {"error": f"この関数は現在利用できません: {name}"}
+        try:
+            return await handler(**(args or {}))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ AIツール実行エラー ({name}): {e}")
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    # ------------------------------------------------------------------ tools
+
+    def _resolve_item(self, name: str):
+        """(アイテム, 候補一覧) を返す。一意に決まらなければアイテムは None。"""
+        match_type, results = self._item_cog()._find_item(name.strip())
+        if match_type == "exact":
+            return results, []
+        if match_type == "partial" and len(results) == 1:
+            return results[0], []
+        return None, results or []
+
+    @staticmethod
+    def _item_dict(item) -> Dict[str, str]:
+        item_id, item_jp, item_en = item
+        return {"item_id": item_id, "name_jp": item_jp, "name_en": item_en}
+
+    async def _find_item(self, name: str) -> Dict[str, Any]:
+        item, candidates = self._resolve_item(name)
+        if item is not None:
+            return {"found": True, "item": self._item_dict(item)}
+        return {
+            "found": False,
+            "candidates": [self._item_dict(candidate) for candidate in candidates[:MAX_CANDIDATES]],
+            "candidate_count": len(candidates),
+        }
+
+    async def _get_market_prices(self, item_name: str, location: Optional[str] = None) -> Dict[str, Any]:
+        item_cog = self._item_cog()
+        item, candidates = self._resolve_item(item_name)
+        if item is None:
+            return {
+                "error": "アイテムを1つに特定できませんでした",
+                "candidates": [self._item_dict(candidate) for candidate in candidates[:MAX_CANDIDATES]],
+            }
+
+        server = "Japan"
+        if location:
+            server = item_cog._normalize_world(location) or item_cog._normalize_dc(location)
+            if server is None:
+                return {"error": f"不明なワールドまたはデータセンターです: {location}"}
+
+        listings = await item_cog._fetch_listings(item[0], server)
+        prices = [listing.get("pricePerUnit", 0) for listing in listings]
+        return {
+            "item": self._item_dict(item),
+            "location": server,
+            "listing_count": len(listings),
+            "lowest_price": min(prices) if prices else None,
+            "average_top5": sum(prices[:5]) // len(prices[:5]) if prices else None,
+            "listings": [
+                {
+                    "price_per_unit": listing.get("pricePerUnit", 0),
+                    "quantity": listing.get("quantity", 0),
+                    "hq": bool(listing.get("hq")),
+                    "world": listing.get("worldName") or server,
+                    "last_review_time": listing.get("lastReviewTime"),
+                }
+                for listing in listings[:MAX_LISTINGS]
+            ],
+            "source": "Universalis",
+        }
+
+    async def _search_character(self, name: str, world: str) -> Dict[str, Any]:
+        cog = self._lodestone_cog()
+        world = cog.normalize_input(world)
+        full_name = " ".join(cog.normalize_input(part) for part in name.split())
+        try:
+            character_id = await cog.lodestone_search(full_name, world)
+        except LodestoneError as e:
+            # 「見つからない」と区別し、AIが存在しないと断言しないようにする
+            return {"error": f"Lodestone に接続できませんでした: {e}", "name": full_name, "world": world}
+        if not character_id:
+            return {"found": False, "name": full_name, "world": world}
+        return {
+            "found": True,
+            "name": full_name,
+            "world": world,
+            "character_id": character_id,
+            "lodestone_url": cog.get_lodestone_url(character_id),
+        }
+
+    async def _web_search(self, query: str) -> Dict[str, Any]:
+        return {"query": query, "result": await self.search(query), "source": "Google Search"}
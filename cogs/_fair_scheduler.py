@@ -0,0 +1,183 @@
+# cogs/_fair_scheduler.py
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Hashable, Optional
+
+
+class SchedulerBusy(Exception):
+    """待ち行列が上限に達していて、リクエストを受け付けられないことを表す例外"""
+
+
+class Superseded(Exception):
+    """同じユーザーの新しいリクエストに置き換えられ、待ち行列から外されたことを表す例外"""
+
+
+class _Ticket:
+    """待ち行列に並んでいるリクエスト1件分"""
+
+    def __init__(self, user: Hashable, key: Hashable, group: Hashable = None):
+        self.user = user
+        self.key = key
+        self.group = group
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class FairScheduler:
+    """
+    ユーザーごとの待ち行列と全体の同時実行数上限を持つスケジューラー。
+
+    空きが出るたびに、待っているユーザーを順番に1件ずつ（ラウンドロビン）
+    実行させるため、1人が大量に送っても他のユーザーの順番は後回しにならない。
+    同じ key（ユーザー + チャンネルなど）の待機中リクエストは、新しいものが
+    来た時点で Superseded で打ち切る。
+
+    group_limits を指定すると、グループ（性格など）ごとの同時実行数も制限する。
+    上限に達したグループのリクエストは全体の枠を取らずに待ち、その間は
+    別のグループのリクエストを先に実行する。
+
+    使い方:
+        async with scheduler.slot(user_id, (user_id, channel_id), group="normal"):
+            await do_request()
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue_per_user: int = 3,
+        max_queue: int = 50,
+        group_limits: Optional[Dict[Hashable, int]] = None,
+    ):
+        """
+        Args:
+            max_concurrency: 同時に実行するリクエスト数の上限
+            max_queue_per_user: 1ユーザーが待たせておけるリクエスト数の上限
+            max_queue: 全体で待たせておけるリクエスト数の上限
+            group_limits: グループごとの同時実行数の上限（無いグループは全体の上限のみ）
+        """
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.max_queue_per_user = max(int(max_queue_per_user), 1)
+        self.max_queue = max(int(max_queue), 1)
+        self.group_limits = {group: max(int(limit), 1) for group, limit in (group_limits or {}).items()}
+        self._group_running: Dict[Hashable, int] = {}
+
+        self._queues: Dict[Hashable, Deque[_Ticket]] = {}
+        # 待っているユーザーの順番（先頭から1件ずつ実行し、残りがあれば末尾に回す）
+        self._order: Deque[Hashable] = deque()
+        self._by_key: "OrderedDict[Hashable, _Ticket]" = OrderedDict()
+        self.running = 0
+
+        # 統計
+        self.granted = 0
+        self.rejected = 0
+        self.superseded = 0
+
+    def queued(self, user: Optional[Hashable] = None) -> int:
+        """待機中のリクエスト数（user 指定時はそのユーザーの分だけ）"""
+        if user is not None:
+            return len(self._queues.get(user, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    # ------------------------------------------------------------------ queue
+
+    def _remove(self, ticket: _Ticket):
+        queue = self._queues.get(ticket.user)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.user]
+                self._order.remove(ticket.user)
+        if self._by_key.get(ticket.key) is ticket:
+            del self._by_key[ticket.key]
+
+    def _has_room(self, group: Hashable) -> bool:
+        limit = self.group_limits.get(group)
+        return limit is None or self._group_running.get(group, 0) < limit
+
+    def _start(self, group: Hashable):
+        self.running += 1
+        self.granted += 1
+        self._group_running[group] = self._group_running.get(group, 0) + 1
+
+    def _next_user(self) -> Optional[Hashable]:
+        """先頭のリクエストを実行できる、順番が最も早いユーザー"""
+        for index, user in enumerate(self._order):
+            if self._has_room(self._queues[user][0].group):
+                del self._order[index]
+                return user
+        return None
+
+    def _pump(self):
+        """空きがある限り、ユーザーを順番に回して待機中のリクエストを実行させる。"""
+        while self.running < self.max_concurrency:
+            # グループの上限に達しているユーザーは飛ばし、順番はそのまま保つ
+            user = self._next_user()
+            if user is None:
+                break
+            queue = self._queues[user]
+            ticket = queue.popleft()
+            if queue:
+                self._order.append(user)
+            else:
+                del self._queues[user]
+            if self._by_key.get(ticket.key) is ticket:
+                del self._by_key[ticket.key]
+
+            self._start(ticket.group)
+            ticket.granted.set_result(None)
+
+    def _release(self, group: Hashable = None):
+        self.running -= 1
+        self._group_running[group] -= 1
+        self._pump()
+
+    async def acquire(self, user: Hashable, key: Hashable, group: Hashable = None):
+        """
+        実行枠を確保する。確保できるまで待ち、終わったら必ず _release(group) すること。
+
+        Raises:
+            SchedulerBusy: 待ち行列が上限に達している
+            Superseded: 待機中に同じ key の新しいリクエストが来た
+        """
+        # 同じ key の古い待機中リクエストは新しいものに置き換える
+        previous = self._by_key.get(key)
+        if previous is not None:
+            self._remove(previous)
+            self.superseded += 1
+            previous.granted.set_exception(Superseded())
+
+        # 待機中のリクエストは、全体の枠が埋まっているかグループの上限で止まっているものだけ。
+        # 同じグループが待っていればそのグループにも空きは無いため、追い越しにはならない
+        if self.running < self.max_concurrency and self._has_room(group):
+            self._start(group)
+            return
+
+        if self.queued(user) >= self.max_queue_per_user or self.queued() >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerBusy()
+
+        ticket = _Ticket(user, key, group)
+        if user not in self._queues:
+            self._queues[user] = deque()
+            self._order.append(user)
+        self._queues[user].append(ticket)
+        self._by_key[key] = ticket
+
+        try:
+            await ticket.granted
+        except asyncio.CancelledError:
+            if ticket.granted.done() and not ticket.granted.cancelled() and ticket.granted.exception() is None:
+                # 枠を割り当てられた直後にキャンセルされた場合は、枠を次に回す
+                self._release(group)
+            else:
+                self._remove(ticket)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, user: Hashable, key: Hashable, group: Hashable = None):
+        """acquire() と解放をまとめて行うコンテキストマネージャー"""
+        await self.acquire(user, key, group)
+        try:
+            yield
+        finally:
+            self._release(group)
@@ -0,0 +1,81 @@
+# cogs/_feed_client.py
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+import aiohttp
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+}
+
+
+class FeedNotModified(Exception):
+    """条件付きGETで 304 Not Modified が返ったことを表す例外"""
+
+    def __init__(self, url: str, tweet_ids: list):
+        super().__init__(f"not modified: {url}")
+        self.url = url
+        self.tweet_ids = tweet_ids
+
+
+class FeedClient:
+    """
+    フィード取得用の共有HTTPクライアント。
+
+    セッションを使い回し、URLごとに ETag / Last-Modified を保持して
+    条件付きリクエストを送る。検証子は呼び出し側が内容を正しく処理できた
+    時点で remember() により保存する。
+    """
+
+    def __init__(self, timeout: float = 20):
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """セッションが閉じていれば再生成して返す。"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self._timeout, headers=DEFAULT_HEADERS
+            )
+        return self._session
+
+    @asynccontextmanager
+    async def get(self, url: str, headers: Optional[Dict] = None, conditional: bool = True):
+        """
+        URLを取得する。conditional=True の場合、保存済みの検証子を付けて送る。
+
+        使い方:
+            async with client.get(url) as response:
+                if response.status == 304:
+                    ...
+        """
+        request_headers = dict(headers or {})
+        if conditional and url in self._validators:
+            etag, last_modified = self._validators[url]
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        async with self._ensure_session().get(url, headers=request_headers) as response:
+            yield response
+
+    def remember(self, url: str, response: aiohttp.ClientResponse):
+        """レスポンスの ETag / Last-Modified を次回の条件付きリクエスト用に保存する。"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validators[url] = (etag, last_modified)
+
+    def forget(self, url: str):
+        """保存済みの検証子を破棄する。"""
+        self._validators.pop(url, None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
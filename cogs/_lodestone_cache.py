@@ -0,0 +1,187 @@
+# cogs/_lodestone_cache.py
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from cogs._write_behind import JsonWriteBehind
+
+# 「見つからなかった」ことを表すキャッシュの値
+NOT_FOUND = None
+
+
+class LodestoneCache:
+    """
+    (キャラクター名, ワールド) → キャラクターID の検索結果キャッシュ。
+
+    見つかった結果は長く（hit_ttl）、見つからなかった結果は短く（miss_ttl）保持する。
+    同じ検索が同時に来た場合は1回だけ Lodestone に問い合わせ、結果を共有する。
+    通信エラーはキャッシュしない。内容はファイルに遅延書き込みし、再起動後も使う。
+    """
+
+    def __init__(
+        self,
+        cache_file: str,
+        hit_ttl: float = 30 * 86400,
+        miss_ttl: float = 600,
+        max_entries: int = 5000,
+        delay: float = 5.0,
+    ):
+        """
+        Args:
+            cache_file: 保存先のJSONファイル
+            hit_ttl: 見つかった結果の有効期限（秒）
+            miss_ttl: 見つからなかった結果の有効期限（秒）
+            max_entries: 保持する件数の上限（超えた分は古いものから捨てる）
+            delay: 変更からファイルへ書き込むまでの秒数
+        """
+        self.cache_file = Path(cache_file)
+        self.hit_ttl = max(float(hit_ttl), 0)
+        self.miss_ttl = max(float(miss_ttl), 0)
+        self.max_entries = max(int(max_entries), 1)
+        self.delay = delay
+
+        # キー → [キャラクターID または None, 保存時刻(UNIX秒)]
+        self._entries: "OrderedDict[str, List]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._persistence = JsonWriteBehind(self.cache_file, self.snapshot, delay, "Lodestoneキャッシュ")
+
+        # 統計
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(character_name: str, world_name: str) -> str:
+        return f"{world_name}/{character_name}"
+
+    def _expired(self, entry: List, now: float) -> bool:
+        ttl = self.miss_ttl if entry[0] is NOT_FOUND else self.hit_ttl
+        return now - entry[1] > ttl
+
+    @property
+    def hit_rate(self) -> float:
+        """キャッシュまたは同時実行中の検索で済んだ割合"""
+        answered = self.hits + self.negative_hits + self.coalesced
+        total = answered + self.misses
+        return answered / total if total else 0.0
+
+    # ------------------------------------------------------------------ lookup
+
+    def get(self, character_name: str, world_name: str) -> Tuple[bool, Optional[str]]:
+        """(キャッシュにあるか, キャラクターID または None) を返す。"""
+        key = self.key(character_name, world_name)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if self._expired(entry, time.time()):
+            del self._entries[key]
+            self.mark_dirty()
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, character_name: str, world_name: str, character_id: Optional[str]):
+        key = self.key(character_name, world_name)
+        self._entries[key] = [character_id, time.time()]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.mark_dirty()
+
+    async def lookup(
+        self,
+        character_name: str,
+        world_name: str,
+        fetch: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        """
+        キャッシュを引き、無ければ fetch() で検索して結果を保存する。
+
+        fetch は見つからなければ None を返し、通信エラーは例外を投げること
+        （例外は呼び出し元に伝わり、キャッシュされない）。
+        """
+        cached, character_id = self.get(character_name, world_name)
+        if cached:
+            if character_id is NOT_FOUND:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return character_id
+
+        key = self.key(character_name, world_name)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, character_name, world_name, fetch))
+            # 待ち手が全員キャンセルされた後のエラーも回収しておく
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        # 待っている1人がキャンセルされても、他の待ち手のために検索は続ける
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, character_name, world_name, fetch) -> Optional[str]:
+        try:
+            character_id = await fetch()
+            self.put(character_name, world_name, character_id)
+            return character_id
+        finally:
+            self._inflight.pop(key, None)
+
+    # ------------------------------------------------------------------ persistence
+
+    def load(self):
+        """保存済みのキャッシュを読み込む（期限切れは捨てる）。"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError as e:
+            print(f"❌ Lodestoneキャッシュ読み込みエラー: {e}")
+            data = {}
+
+        now = time.time()
+        entries = sorted(
+            (
+                (key, [value[0], float(value[1])])
+                for key, value in data.items()
+                if isinstance(value, list) and len(value) == 2
+            ),
+            key=lambda item: item[1][1],
+        )
+        self._entries = OrderedDict(
+            (key, entry) for key, entry in entries if not self._expired(entry, now)
+        )
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, List]:
+        return {key: list(entry) for key, entry in self._entries.items()}
+
+    async def flush(self):
+        """現在のキャッシュを即座にファイルへ書き込む。"""
+        await self._persistence.flush()
+
+    def mark_dirty(self):
+        """変更を通知し、遅延書き込みを予約する。"""
+        self._persistence.mark_dirty()
+
+    async def close(self):
+        """実行中の検索と遅延書き込みを停止し、未保存の変更があれば書き込む。"""
+        tasks = [task for task in self._inflight.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await self._persistence.close()
+        except OSError:
+            pass
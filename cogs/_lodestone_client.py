@@ -0,0 +1,85 @@
+# cogs/_lodestone_client.py
+import asyncio
+from typing import Dict, Optional
+import aiohttp
+
+LODESTONE_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+}
+
+
+class LodestoneError(Exception):
+    """Lodestone に問い合わせできなかった（通信エラー・タイムアウト・混雑）"""
+
+
+class LodestoneClient:
+    """
+    Lodestone 用の共有HTTPクライアント。
+
+    1つのセッションを使い回すことで接続（TLS）を再利用し、同じホストへの
+    同時接続数を limit_per_host に制限する。上限を超えたリクエストは
+    最大 pool_timeout 秒まで接続の空きを待ち、それでも空かなければ
+    タイムアウトとして LodestoneError を投げる。
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int = 4,
+        timeout: float = 10,
+        connect_timeout: float = 5,
+        pool_timeout: float = 30,
+    ):
+        """
+        Args:
+            limit_per_host: 同じホストへの同時接続数の上限
+            timeout: 応答の読み込みの上限秒数
+            connect_timeout: 新しい接続の確立（TCP + TLS）の上限秒数
+            pool_timeout: 接続の空き待ちの上限秒数
+        """
+        self.limit_per_host = max(int(limit_per_host), 1)
+        # connect は空き待ちを含むため、空き待ちの分を足した別枠にする
+        self._timeout = aiohttp.ClientTimeout(
+            total=pool_timeout + connect_timeout + timeout,
+            connect=pool_timeout + connect_timeout,
+            sock_connect=connect_timeout,
+            sock_read=timeout,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # 統計
+        self.requests = 0
+        self.errors = 0
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """セッションが閉じていれば再生成して返す。"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self._timeout, headers=LODESTONE_HEADERS
+            )
+        return self._session
+
+    async def get_text(self, url: str, params: Optional[Dict] = None) -> str:
+        """
+        URLを取得して本文を返す。
+
+        Raises:
+            LodestoneError: 接続エラー・HTTPエラー・タイムアウト
+        """
+        self.requests += 1
+        try:
+            async with self._ensure_session().get(url, params=params) as response:
+                response.raise_for_status()
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            raise LodestoneError(f"{type(e).__name__}: {e}") from e
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
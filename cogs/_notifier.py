@@ -0,0 +1,208 @@
+# cogs/_notifier.py
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import aiohttp
+import discord
+from cogs._write_behind import JsonWriteBehind
+
+
+class ChannelDelivery:
+    """チャンネル1つ分の配信状態。"""
+
+    def __init__(self, channel_id: int, data: Dict | None = None):
+        data = data or {}
+        self.channel_id = channel_id
+        self.delivered = int(data.get("delivered", 0))
+        self.failed = int(data.get("failed", 0))
+        self.retries = int(data.get("retries", 0))
+        self.consecutive_failures = int(data.get("consecutive_failures", 0))
+        self.last_success = float(data.get("last_success", 0.0))
+        self.last_error: Optional[str] = data.get("last_error")
+        self.last_key: Optional[str] = data.get("last_key")
+
+    def record_success(self, key: Optional[str]):
+        self.delivered += 1
+        self.consecutive_failures = 0
+        self.last_success = time.time()
+        self.last_key = key
+
+    def record_failure(self, error: str):
+        self.failed += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+
+    def to_dict(self) -> Dict:
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "last_key": self.last_key,
+        }
+
+
+class NotificationDispatcher:
+    """
+    チャンネルごとの送信キューを持つ通知ディスパッチャ。
+
+    Discordのメッセージ送信はチャンネル単位のレート制限バケットに分かれるため、
+    同じチャンネルへの投稿はキューで順番に、別のチャンネルへは並行して送る。
+    全体の同時送信数は max_concurrency で抑え、グローバル制限に近づかないようにする。
+    一時的なエラー（429・5xx・通信エラー）は指数バックオフで再試行し、
+    権限不足やチャンネル削除などの恒久的なエラーは再試行しない。
+    """
+
+    def __init__(
+        self,
+        state_file: str,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        base_delay: float = 2.0,
+        delay: float = 5.0,
+    ):
+        """
+        Args:
+            state_file: 配信状態の保存先
+            max_concurrency: 全チャンネル合計の同時送信数
+            max_retries: 一時的なエラーの再試行回数
+            base_delay: 再試行の初回待ち時間（秒）。以降は倍々に延ばす
+            delay: 配信状態の変更からファイルへ書き込むまでの秒数
+        """
+        self.state_file = Path(state_file)
+        self.max_retries = max(int(max_retries), 0)
+        self.base_delay = max(float(base_delay), 0)
+        self._semaphore = asyncio.Semaphore(max(int(max_concurrency), 1))
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._channels: Dict[int, ChannelDelivery] = {}
+        self._persistence = JsonWriteBehind(self.state_file, self.snapshot, delay, "配信状態")
+        self.load()
+
+    # ------------------------------------------------------------------ state
+
+    def load(self):
+        """保存済みの配信状態を読み込む"""
+        try:
+            if self.state_file.exists():
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._channels = {
+                    int(channel_id): ChannelDelivery(int(channel_id), value)
+                    for channel_id, value in data.items()
+                }
+        except (json.JSONDecodeError, AttributeError, ValueError) as e:
+            print(f"❌ 配信状態読み込みエラー: {e}")
+            self._channels = {}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {str(channel_id): state.to_dict() for channel_id, state in self._channels.items()}
+
+    def mark_dirty(self):
+        """配信状態の変更を通知し、遅延書き込みを予約する。"""
+        self._persistence.mark_dirty()
+
+    def get(self, channel_id: int) -> ChannelDelivery:
+        if channel_id not in self._channels:
+            self._channels[channel_id] = ChannelDelivery(channel_id)
+        return self._channels[channel_id]
+
+    def items(self):
+        return self._channels.items()
+
+    # ------------------------------------------------------------------ sending
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """
+        一時的なエラーなら待ち時間の目安（不明なら0）を、恒久的なエラーなら None を返す。
+        """
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if isinstance(error, (discord.Forbidden, discord.NotFound)):
+            return None
+        if isinstance(error, discord.HTTPException):
+            return 0.0 if error.status == 429 or error.status >= 500 else None
+        if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError)):
+            return 0.0
+        return None
+
+    async def _send(self, channel: discord.abc.Messageable, key: Optional[str], kwargs: Dict) -> bool:
+        state = self.get(channel.id)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await channel.send(**kwargs)
+                state.record_success(key)
+                return True
+            except Exception as e:
+                retry_after = self._retry_after(e)
+                if retry_after is None or attempt >= self.max_retries:
+                    print(f"通知送信エラー (チャンネル {channel.id}): {e}")
+                    state.record_failure(str(e))
+                    return False
+                delay = max(retry_after, self.base_delay * (2 ** attempt))
+                print(
+                    f"通知送信を再試行します (チャンネル {channel.id}, "
+                    f"{attempt + 1}/{self.max_retries}回目, {delay:.1f}秒後): {e}"
+                )
+                state.retries += 1
+                await asyncio.sleep(delay)
+        return False
+
+    async def _run_worker(self, channel: discord.abc.Messageable):
+        queue = self._queues[channel.id]
+        # キューが空になったら終了し、次の送信時に作り直す
+        while not queue.empty():
+            key, kwargs, future = queue.get_nowait()
+            try:
+                if not future.done():
+                    result = await self._send(channel, key, kwargs)
+                    if not future.done():
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            finally:
+                queue.task_done()
+
+    def submit(self, channel: discord.abc.Messageable, key: Optional[str] = None, **kwargs) -> asyncio.Future:
+        """
+        チャンネルの送信キューに投稿を追加する。
+
+        Args:
+            channel: 送信先
+            key: 配信状態に記録する識別子（ツイートIDなど）
+            kwargs: channel.send() に渡す引数
+
+        Returns:
+            送信できたかどうか（bool）が設定される Future
+        """
+        future = asyncio.get_event_loop().create_future()
+        queue = self._queues.setdefault(channel.id, asyncio.Queue())
+        queue.put_nowait((key, kwargs, future))
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.create_task(self._run_worker(channel))
+        return future
+
+    async def close(self):
+        """送信中のワーカーを停止し、配信状態を保存する。"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, _, future = queue.get_nowait()
+                future.cancel()
+        try:
+            await self._persistence.close()
+        except OSError:
+            pass
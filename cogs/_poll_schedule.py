@@ -0,0 +1,108 @@
+# cogs/_poll_schedule.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+JST = timezone(timedelta(hours=9))
+# X (Twitter) Snowflake ID のエポック（ミリ秒）
+TWITTER_EPOCH_MS = 1288834974657
+
+
+def snowflake_to_datetime(tweet_id) -> datetime:
+    """Snowflake ID から投稿日時（JST）を求める。"""
+    timestamp_ms = (int(tweet_id) >> 22) + TWITTER_EPOCH_MS
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=JST)
+
+
+class AdaptivePollSchedule:
+    """
+    投稿の多い時間帯は短い間隔で、静かな時間帯は指数的に間隔を延ばす
+    定期チェックのスケジューラ。
+
+    投稿時間帯の傾向は、通知済みツイートIDの Snowflake タイムスタンプから
+    JST の時刻ごとのヒストグラムとして学習する。
+    active_windows に指定した時間帯（メンテナンス・パッチノート公開など）は
+    常に最短間隔でチェックする。
+    """
+
+    def __init__(
+        self,
+        min_minutes: float,
+        max_minutes: float,
+        active_windows: Optional[List[Dict]] = None,
+    ):
+        """
+        Args:
+            min_minutes: 最短のチェック間隔（分）
+            max_minutes: 最長のチェック間隔（分）
+            active_windows: {"weekday": 0-6 (月=0, 省略可), "start": 時, "end": 時} のリスト（JST）
+        """
+        self.min_minutes = max(float(min_minutes), 1)
+        self.max_minutes = max(float(max_minutes), self.min_minutes)
+        self.active_windows = active_windows or []
+        self._hour_counts = [0] * 24
+        self._observed: set = set()
+        self._backoff = 0
+
+    def observe(self, tweet_ids: Iterable):
+        """ツイートIDを投稿時間帯の学習データとして取り込む。"""
+        for tweet_id in tweet_ids:
+            if not str(tweet_id).isdigit() or tweet_id in self._observed:
+                continue
+            self._observed.add(tweet_id)
+            self._hour_counts[snowflake_to_datetime(tweet_id).hour] += 1
+
+    def density(self, now: datetime) -> float:
+        """
+        現在時刻の前後1時間を含めた投稿密度（最も多い時間帯を1.0とした比率）。
+        学習データが無い場合は1.0（最短間隔）として扱う。
+        """
+        if not any(self._hour_counts):
+            return 1.0
+
+        def smoothed(hour: int) -> float:
+            return (
+                self._hour_counts[(hour - 1) % 24] * 0.5
+                + self._hour_counts[hour]
+                + self._hour_counts[(hour + 1) % 24] * 0.5
+            )
+
+        peak = max(smoothed(hour) for hour in range(24))
+        return smoothed(now.hour) / peak if peak else 1.0
+
+    def in_active_window(self, now: datetime) -> bool:
+        for window in self.active_windows:
+            weekday = window.get("weekday")
+            if weekday is not None and int(weekday) != now.weekday():
+                continue
+            start, end = float(window.get("start", 0)), float(window.get("end", 24))
+            hour = now.hour + now.minute / 60
+            if start <= hour < end if start <= end else (hour >= start or hour < end):
+                return True
+        return False
+
+    def next_interval(self, found_new: bool, now: Optional[datetime] = None) -> Tuple[float, str]:
+        """
+        次回までのチェック間隔（分）と、その理由を返す。
+
+        Args:
+            found_new: 今回のチェックで新規ツイートがあった場合True
+        """
+        now = now or datetime.now(JST)
+
+        if found_new:
+            self._backoff = 0
+            return self.min_minutes, "新規投稿あり"
+        if self.in_active_window(now):
+            self._backoff = 0
+            return self.min_minutes, "重点時間帯"
+
+        density = self.density(now)
+        if density >= 0.5:
+            self._backoff = 0
+            return self.min_minutes, f"投稿の多い時間帯 (密度 {density:.2f})"
+
+        # 静かな時間帯は指数バックオフ。中程度の時間帯は最短の4倍までに抑える
+        self._backoff = min(self._backoff + 1, 16)
+        ceiling = self.max_minutes if density < 0.2 else min(self.min_minutes * 4, self.max_minutes)
+        interval = min(self.min_minutes * (2 ** self._backoff), ceiling)
+        return interval, f"静かな時間帯 (密度 {density:.2f}, バックオフ {self._backoff})"
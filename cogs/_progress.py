@@ -0,0 +1,136 @@
+# cogs/_progress.py
+import asyncio
+import time
+from typing import Optional
+import discord
+
+
+class ProgressReporter:
+    """
+    長時間ジョブの進捗をDiscordメッセージに反映するクラス。
+
+    タスク側は advance() でメモリ上のカウンタを更新するだけで、
+    メッセージの編集は単一のバックグラウンドコルーチンが
+    最大 interval 秒に1回まとめて行う（編集レート制限対策）。
+
+    使い方:
+        reporter = ProgressReporter(msg, total=100, label="アイテム更新中")
+        reporter.start()
+        ...
+        reporter.advance()
+        ...
+        await reporter.stop()
+    """
+
+    def __init__(
+        self,
+        message: discord.Message,
+        total: int,
+        label: str = "処理中",
+        interval: float = 5.0,
+    ):
+        """
+        Args:
+            message: 編集対象のメッセージ
+            total: 処理件数の合計
+            label: 表示用ラベル
+            interval: メッセージ編集の最短間隔（秒）
+        """
+        self.message = message
+        self.total = max(int(total), 0)
+        self.label = label
+        self.interval = max(float(interval), 1.0)
+
+        self.done = 0
+        self.failed = 0
+        self._started_at: Optional[float] = None
+        self._stopped_at: Optional[float] = None
+        self._last_rendered: Optional[str] = None
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------ update
+
+    def advance(self, n: int = 1, failed: bool = False):
+        """処理済み件数を進める（同期・await不要）。"""
+        self.done += n
+        if failed:
+            self.failed += n
+        self._dirty.set()
+
+    # ------------------------------------------------------------------ render
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        seconds = int(seconds)
+        if seconds < 60:
+            return f"{seconds}秒"
+        if seconds < 3600:
+            return f"{seconds // 60}分{seconds % 60:02d}秒"
+        return f"{seconds // 3600}時間{seconds % 3600 // 60:02d}分"
+
+    def render(self) -> str:
+        """現在の進捗を表示用文字列に整形する。"""
+        elapsed = self.elapsed
+        text = f"🔄 {self.label}... ({self.done}/{self.total})"
+
+        if self.done and elapsed > 0:
+            rate = self.done / elapsed
+            text += f" | {rate:.1f}件/秒"
+            remaining = self.total - self.done
+            if remaining > 0:
+                text += f" | 残り約{self.format_duration(remaining / rate)}"
+
+        if self.failed:
+            text += f" | 失敗 {self.failed}件"
+        return text
+
+    async def _flush(self):
+        content = self.render()
+        if content == self._last_rendered:
+            return
+        try:
+            await self.message.edit(content=content)
+            self._last_rendered = content
+        except discord.HTTPException as e:
+            print(f"[progress] 進捗メッセージ更新エラー: {e}")
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            await self._flush()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """バックグラウンドの更新コルーチンを開始する。"""
+        if self._task is None:
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, flush: bool = True):
+        """
+        更新コルーチンを停止する。
+
+        Args:
+            flush: True の場合、停止前に最新の進捗を1回反映する
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._stopped_at = time.monotonic()
+        if flush:
+            await self._flush()
+
+    @property
+    def elapsed(self) -> float:
+        """開始からの経過秒数（停止後は停止時点で固定）。"""
+        if self._started_at is None:
+            return 0.0
+        return (self._stopped_at or time.monotonic()) - self._started_at
@@ -0,0 +1,163 @@
+# cogs/_source_health.py
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+from cogs._write_behind import JsonWriteBehind
+
+
+class SourceHealth:
+    """
+    取得元1つ分の健全性指標。
+
+    成功率・応答時間・鮮度（他の取得元と比べて最新IDを返せたか）を
+    指数移動平均で保持する。
+    """
+
+    ALPHA = 0.2
+
+    def __init__(self, key: str, data: Dict | None = None):
+        data = data or {}
+        self.key = key
+        self.success_rate = float(data.get("success_rate", 1.0))
+        self.latency = float(data.get("latency", 0.0))
+        self.freshness = float(data.get("freshness", 1.0))
+        self.attempts = int(data.get("attempts", 0))
+        self.consecutive_failures = int(data.get("consecutive_failures", 0))
+        self.last_attempt = float(data.get("last_attempt", 0.0))
+        self.last_success = float(data.get("last_success", 0.0))
+
+    def _ewma(self, current: float, value: float) -> float:
+        if self.attempts <= 1:
+            return value
+        return current + self.ALPHA * (value - current)
+
+    def record(self, success: bool, latency: float):
+        """1回の取得結果を反映する。"""
+        self.attempts += 1
+        self.last_attempt = time.time()
+        self.success_rate = self._ewma(self.success_rate, 1.0 if success else 0.0)
+        self.latency = self._ewma(self.latency, latency)
+        if success:
+            self.consecutive_failures = 0
+            self.last_success = self.last_attempt
+        else:
+            self.consecutive_failures += 1
+
+    def record_freshness(self, fresh: bool):
+        """取得できたIDの最大値が全体の最大値に並んでいたかを反映する。"""
+        self.freshness += self.ALPHA * ((1.0 if fresh else 0.0) - self.freshness)
+
+    @property
+    def score(self) -> float:
+        """大きいほど優先。成功率と鮮度を重視し、遅い取得元は減点する。"""
+        return self.success_rate * (0.5 + 0.5 * self.freshness) / (1 + self.latency / 10)
+
+    def to_dict(self) -> Dict:
+        return {
+            "success_rate": round(self.success_rate, 4),
+            "latency": round(self.latency, 3),
+            "freshness": round(self.freshness, 4),
+            "attempts": self.attempts,
+            "consecutive_failures": self.consecutive_failures,
+            "last_attempt": self.last_attempt,
+            "last_success": self.last_success,
+        }
+
+
+class SourceHealthTracker:
+    """
+    取得元ごとの健全性を管理し、優先順位とスキップ判定を行うクラス。
+
+    連続して failure_threshold 回失敗した取得元は、probe_interval 秒に1回の
+    試行（復旧確認）を除いてスキップする。状態はJSONファイルへ遅延書き込みする
+    （mark_dirty() から delay 秒後にまとめて書き込む）。
+    """
+
+    def __init__(
+        self,
+        health_file: str,
+        failure_threshold: int = 3,
+        probe_interval: float = 1800,
+        delay: float = 5.0,
+    ):
+        self.health_file = Path(health_file)
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.probe_interval = max(float(probe_interval), 0)
+        self._sources: Dict[str, SourceHealth] = {}
+        self._persistence = JsonWriteBehind(self.health_file, self.snapshot, delay, "取得元ヘルス")
+        self.load()
+
+    def load(self):
+        """保存済みの指標を読み込む"""
+        try:
+            if self.health_file.exists():
+                with open(self.health_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._sources = {key: SourceHealth(key, value) for key, value in data.items()}
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"❌ 取得元ヘルス読み込みエラー: {e}")
+            self._sources = {}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {key: health.to_dict() for key, health in self._sources.items()}
+
+    def mark_dirty(self):
+        """変更を通知し、遅延書き込みを予約する。"""
+        self._persistence.mark_dirty()
+
+    async def close(self):
+        """遅延書き込みを停止し、未保存の変更があれば書き込む。"""
+        try:
+            await self._persistence.close()
+        except OSError:
+            pass
+
+    def get(self, key: str) -> SourceHealth:
+        if key not in self._sources:
+            self._sources[key] = SourceHealth(key)
+        return self._sources[key]
+
+    def is_suspended(self, key: str) -> bool:
+        """連続失敗中で、まだ復旧確認の時期ではない場合True"""
+        health = self.get(key)
+        if health.consecutive_failures < self.failure_threshold:
+            return False
+        return time.time() - health.last_attempt < self.probe_interval
+
+    def next_probe_in(self, key: str) -> float:
+        """次の復旧確認までの秒数（スキップ中でなければ0）"""
+        if not self.is_suspended(key):
+            return 0.0
+        return self.probe_interval - (time.time() - self.get(key).last_attempt)
+
+    def rank(self, sources: List[Dict]) -> List[Dict]:
+        """
+        取得元をスコア順に並べ、スキップ中のものを除外して返す。
+        全てスキップ中になる場合は、最もスコアの高いものだけを残す。
+        """
+        ordered = sorted(sources, key=lambda source: self.get(source["key"]).score, reverse=True)
+        active = [source for source in ordered if not self.is_suspended(source["key"])]
+        if not active and ordered:
+            active = ordered[:1]
+        return active
+
+    def record(self, key: str, success: bool, latency: float):
+        self.get(key).record(success, latency)
+
+    def record_freshness(self, results: Dict[str, List[str]]):
+        """
+        今回成功した取得元について、最大IDが全体の最大IDに並んだかを記録する。
+
+        Args:
+            results: 取得元キー → 取得したツイートIDのリスト
+        """
+        maxima = {key: max(int(i) for i in ids) for key, ids in results.items() if ids}
+        if len(maxima) < 2:
+            return
+        newest = max(maxima.values())
+        for key, value in maxima.items():
+            self.get(key).record_freshness(value >= newest)
+
+    def items(self):
+        return self._sources.items()
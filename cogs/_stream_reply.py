@@ -0,0 +1,181 @@
+# cogs/_stream_reply.py
+import asyncio
+from typing import List, Optional
+import discord
+from discord.ext import commands
+
+# Discord の1メッセージあたりの文字数上限
+MESSAGE_LIMIT = 2000
+
+
+class StreamingReply:
+    """
+    生成途中の文章を返信メッセージに逐次反映するクラス。
+
+    生成側は append() でテキストを追記するだけで、メッセージの編集は
+    単一のバックグラウンドコルーチンが最大 interval 秒に1回まとめて行う
+    （編集レート制限対策）。1通に収まらない分は続きのメッセージとして送る。
+
+    使い方:
+        reply = StreamingReply(ctx)
+        await reply.start()
+        async for chunk in stream:
+            reply.append(chunk.text)
+        await reply.finish()
+    """
+
+    CURSOR = " ▌"
+
+    def __init__(
+        self,
+        ctx: commands.Context,
+        placeholder: str = "💭 考え中...",
+        interval: float = 1.0,
+        limit: int = 1900,
+    ):
+        """
+        Args:
+            ctx: 返信先のコンテキスト
+            placeholder: 最初のテキストが届くまで表示する文字列
+            interval: メッセージ編集の最短間隔（秒）
+            limit: 1通あたりの最大文字数（カーソル分の余裕を残す）
+        """
+        self.ctx = ctx
+        self.placeholder = placeholder
+        self.interval = max(float(interval), 0.2)
+        self.limit = max(min(int(limit), MESSAGE_LIMIT - len(self.CURSOR)), 100)
+
+        self.messages: List[discord.Message] = []
+        self._text = ""
+        # 確定済みメッセージに含まれる文字数（self._text の先頭から）
+        self._committed = 0
+        self._last_rendered: Optional[str] = None
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    @property
+    def text(self) -> str:
+        """これまでに受け取った全文"""
+        return self._text
+
+    def append(self, text: str):
+        """テキストを追記する（同期・await不要）。"""
+        if text:
+            self._text += text
+            self._dirty.set()
+
+    # ------------------------------------------------------------------ render
+
+    def _split_point(self, text: str) -> int:
+        """limit 以内で、なるべく改行・句点の直後で区切る位置を返す。"""
+        window = text[: self.limit]
+        for separator in ("\n\n", "\n", "。", ". ", "、", " "):
+            index = window.rfind(separator)
+            if index >= self.limit // 2:
+                return index + len(separator)
+        return self.limit
+
+    async def _edit(self, message: discord.Message, content: str):
+        try:
+            await message.edit(content=content)
+        except discord.HTTPException as e:
+            print(f"[stream] 返信メッセージ更新エラー: {e}")
+
+    async def _send_continuation(self, text: str, attempts: int) -> Optional[discord.Message]:
+        """続きのメッセージを送る。attempts 回失敗したら None。"""
+        for attempt in range(attempts):
+            try:
+                return await self.ctx.send(text[: self.limit] or "…")
+            except discord.HTTPException as e:
+                print(f"[stream] 続きのメッセージ送信エラー ({attempt + 1}/{attempts}): {e}")
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(1)
+        return None
+
+    async def _flush(self, final: bool = False):
+        async with self._lock:
+            pending = self._text[self._committed:]
+
+            # 1通に収まらない分は、区切りの良い位置で確定して続きを新しいメッセージへ
+            while len(pending) > self.limit:
+                cut = self._split_point(pending)
+                await self._edit(self.messages[-1], pending[:cut])
+                message = await self._send_continuation(pending[cut:], attempts=3 if final else 1)
+                if message is None:
+                    # 確定位置は進めず、次回の更新で続きの送信をやり直す
+                    return
+                # 続きのメッセージを送れてから確定位置を進める
+                self.messages.append(message)
+                self._committed += cut
+                pending = self._text[self._committed:]
+                self._last_rendered = None
+
+            if not pending:
+                return
+            content = pending if final else pending + self.CURSOR
+            if content != self._last_rendered:
+                await self._edit(self.messages[-1], content)
+                self._last_rendered = content
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            if self._stopping.is_set():
+                return
+            self._dirty.clear()
+            await self._flush()
+            # interval の間は待つが、停止を求められたらすぐに抜ける
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """プレースホルダーを返信し、バックグラウンドの更新コルーチンを開始する。"""
+        if self._task is None:
+            self.messages.append(await self.ctx.reply(self.placeholder))
+            self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        """
+        更新コルーチンに停止を伝え、実行中の更新が終わるまで待つ。
+        送信の途中でキャンセルすると、どこまで送ったかが分からなくなるため中断はしない。
+        """
+        if self._task is not None:
+            self._stopping.set()
+            self._dirty.set()
+            try:
+                await self._task
+            except Exception as e:
+                print(f"[stream] 更新コルーチンのエラー: {e}")
+            self._task = None
+
+    async def finish(self, notice: Optional[str] = None):
+        """
+        更新コルーチンを停止し、全文を確定表示する。
+
+        Args:
+            notice: 末尾に付け加える注記（中断時など）
+        """
+        await self._stop()
+        if notice:
+            self.append(f"\n\n{notice}" if self._text else notice)
+        await self._flush(final=True)
+
+    async def fail(self, text: str):
+        """
+        エラーを表示して終了する。テキストを受け取る前ならプレースホルダーを置き換え、
+        途中まで受け取っていれば末尾に注記する。
+        """
+        await self._stop()
+        if not self.messages:
+            return
+        if self._text:
+            await self.finish(notice=text)
+        else:
+            await self._edit(self.messages[0], text)
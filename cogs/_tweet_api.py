@@ -0,0 +1,143 @@
+# cogs/_tweet_api.py
+import html
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import discord
+from cogs._feed_client import FeedClient
+from cogs._poll_schedule import snowflake_to_datetime
+
+SYNDICATION_TIMELINE_URL = "https://syndication.twitter.com/srv/timeline-profile/screen-name/{username}"
+NEXT_DATA_PATTERN = re.compile(
+    r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', re.DOTALL
+)
+
+
+class TweetApiClient:
+    """
+    ブラウザを使わずにツイートを取得するHTTP専用の取得元。
+
+    埋め込みタイムライン（syndication）が返す JSON からツイートIDと
+    本文・画像などのメタデータをまとめて取り出し、IDごとに保持する。
+    通知時は保持済みのメタデータから埋め込みを作るため、再取得は不要。
+    """
+
+    def __init__(
+        self,
+        feed_client: FeedClient,
+        capacity: int = 200,
+        timeline_url: str = SYNDICATION_TIMELINE_URL,
+    ):
+        """
+        Args:
+            feed_client: 共有HTTPクライアント
+            capacity: 保持するツイート詳細の最大件数
+            timeline_url: 埋め込みタイムラインのURL（{username} を含む）
+        """
+        self.feed_client = feed_client
+        self.timeline_url = timeline_url
+        self.capacity = max(int(capacity), 1)
+        self._details: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def get_cached(self, tweet_id: str) -> Optional[Dict]:
+        """保持済みのツイート詳細（無ければ None）"""
+        return self._details.get(str(tweet_id))
+
+    def _remember(self, details: Dict):
+        self._details[details["id"]] = details
+        self._details.move_to_end(details["id"])
+        while len(self._details) > self.capacity:
+            self._details.popitem(last=False)
+
+    @staticmethod
+    def _parse_tweet(tweet: Dict) -> Optional[Dict]:
+        """syndication のツイートオブジェクトを詳細辞書に変換する。"""
+        tweet_id = str(tweet.get("id_str") or tweet.get("id") or "")
+        if not tweet_id.isdigit():
+            return None
+
+        user = tweet.get("user") or {}
+        text = tweet.get("full_text") or tweet.get("text") or ""
+        media = (tweet.get("extended_entities") or tweet.get("entities") or {}).get("media") or []
+        # 本文末尾の画像用 t.co リンクは埋め込みでは不要
+        for item in media:
+            if item.get("url"):
+                text = text.replace(item["url"], "")
+
+        return {
+            "id": tweet_id,
+            "author": user.get("screen_name", ""),
+            "author_name": user.get("name", ""),
+            "avatar": user.get("profile_image_url_https"),
+            "text": html.unescape(text).strip(),
+            "media": [
+                {"type": item.get("type", "photo"), "url": item.get("media_url_https")}
+                for item in media if item.get("media_url_https")
+            ],
+            "is_retweet": "retweeted_status" in tweet or text.startswith("RT @"),
+            "is_reply": bool(tweet.get("in_reply_to_status_id_str")),
+        }
+
+    async def fetch_timeline(self, username: str, count: int = 2) -> List[Dict]:
+        """
+        埋め込みタイムラインから本人のオリジナル投稿を新しい順に取得する。
+
+        Returns:
+            ツイート詳細の辞書リスト（取得失敗時は例外）
+        """
+        url = self.timeline_url.format(username=username)
+        async with self.feed_client.get(url, conditional=False) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            page = await response.text()
+
+        match = NEXT_DATA_PATTERN.search(page)
+        if not match:
+            raise ValueError("タイムラインのJSONが見つかりません")
+        data = json.loads(match.group(1))
+        entries = data.get("props", {}).get("pageProps", {}).get("timeline", {}).get("entries", [])
+
+        tweets = []
+        for entry in entries:
+            if entry.get("type") != "tweet":
+                continue
+            details = self._parse_tweet((entry.get("content") or {}).get("tweet") or {})
+            if details is None:
+                continue
+            if details["author"].lower() != username.lower():
+                continue
+            if details["is_retweet"] or details["is_reply"]:
+                continue
+            self._remember(details)
+            tweets.append(details)
+
+        tweets.sort(key=lambda details: int(details["id"]), reverse=True)
+        return tweets[:count]
+
+
+def build_tweet_embed(details: Dict) -> discord.Embed:
+    """ツイート詳細から通知用の埋め込みを作る。"""
+    author = details.get("author", "")
+    embed = discord.Embed(
+        description=details.get("text") or None,
+        url=f"https://x.com/{author}/status/{details['id']}",
+        color=discord.Color.blue(),
+        timestamp=snowflake_to_datetime(details["id"]),
+    )
+    embed.set_author(
+        name=f"{details.get('author_name') or author} (@{author})",
+        url=f"https://x.com/{author}",
+        icon_url=details.get("avatar"),
+    )
+
+    media = details.get("media") or []
+    photos = [item["url"] for item in media if item.get("type") == "photo"]
+    preview = photos[0] if photos else (media[0]["url"] if media else None)
+    if preview:
+        embed.set_image(url=preview)
+    if len(media) > 1:
+        embed.set_footer(text=f"X ・ メディア {len(media)}件")
+    else:
+        embed.set_footer(text="X")
+    return embed
@@ -0,0 +1,122 @@
+# cogs/_tweet_state.py
+import json
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from cogs._write_behind import JsonWriteBehind
+
+
+class SeenTweetIds:
+    """
+    1アカウント分の通知済みツイートIDを保持する上限付きソート済み集合。
+
+    IDは整数として昇順に保持し、最大IDの取得は O(1)、
+    存在確認は二分探索で O(log n)。上限を超えたら古いIDから捨てる。
+    """
+
+    def __init__(self, ids: Iterable = (), capacity: int = 100):
+        self.capacity = max(int(capacity), 1)
+        self._ids = sorted({int(tweet_id) for tweet_id in ids if str(tweet_id).isdigit()})
+        self._trim()
+
+    def _trim(self):
+        if len(self._ids) > self.capacity:
+            del self._ids[: len(self._ids) - self.capacity]
+
+    def __contains__(self, tweet_id) -> bool:
+        value = int(tweet_id)
+        index = bisect_left(self._ids, value)
+        return index < len(self._ids) and self._ids[index] == value
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __bool__(self) -> bool:
+        return bool(self._ids)
+
+    def add(self, tweet_id) -> bool:
+        """IDを追加する。既に存在する場合は False。"""
+        if tweet_id in self:
+            return False
+        insort(self._ids, int(tweet_id))
+        self._trim()
+        return True
+
+    def discard(self, tweet_id):
+        value = int(tweet_id)
+        index = bisect_left(self._ids, value)
+        if index < len(self._ids) and self._ids[index] == value:
+            del self._ids[index]
+
+    @property
+    def max_id(self) -> Optional[str]:
+        return str(self._ids[-1]) if self._ids else None
+
+    def to_list(self) -> list:
+        """新しい順の文字列リスト（保存用）"""
+        return [str(tweet_id) for tweet_id in reversed(self._ids)]
+
+
+class TweetStateStore:
+    """
+    アカウントごとの通知済みIDをメモリ上で管理し、ファイルへは遅延書き込みするクラス。
+
+    mark_dirty() で変更を通知すると、delay 秒後にまとめて書き込む（JsonWriteBehind）。
+    通知前に確実に残したい場合は flush() を待つ。
+    """
+
+    def __init__(
+        self,
+        state_file: str,
+        default_account: str,
+        capacity: int = 100,
+        delay: float = 5.0,
+    ):
+        self.state_file = Path(state_file)
+        self.default_account = default_account
+        self.capacity = capacity
+        self.delay = delay
+        self._accounts: Dict[str, SeenTweetIds] = {}
+        self._persistence = JsonWriteBehind(self.state_file, self.snapshot, delay, "送信済みツイート")
+        self.load()
+
+    def load(self):
+        """
+        保存済みの状態を読み込む。
+        旧形式（IDのリスト）は default_account の履歴として扱う。
+        """
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError as e:
+            print(f"❌ 送信済みツイート読み込みエラー: {e}")
+            data = {}
+        if isinstance(data, list):
+            data = {self.default_account: data}
+        self._accounts = {
+            account: SeenTweetIds(ids, self.capacity) for account, ids in data.items()
+        }
+
+    def get(self, account: str) -> SeenTweetIds:
+        if account not in self._accounts:
+            self._accounts[account] = SeenTweetIds(capacity=self.capacity)
+        return self._accounts[account]
+
+    def snapshot(self) -> Dict[str, list]:
+        return {account: ids.to_list() for account, ids in self._accounts.items() if ids}
+
+    # ------------------------------------------------------------------ persistence
+
+    async def flush(self):
+        """現在の状態を即座にファイルへ書き込む。"""
+        await self._persistence.flush()
+
+    def mark_dirty(self):
+        """変更を通知し、遅延書き込みを予約する。"""
+        self._persistence.mark_dirty()
+
+    async def close(self):
+        """遅延書き込みを停止し、未保存の変更があれば書き込む。"""
+        await self._persistence.close()
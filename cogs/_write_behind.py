@@ -0,0 +1,96 @@
+# cogs/_write_behind.py
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+def write_json_atomic(path: Path, data: Any):
+    """
+    一時ファイルに書いて fsync してから os.replace で置き換える。
+    途中でクラッシュしても元のファイルが壊れることはない。
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonWriteBehind:
+    """
+    メモリ上の状態をJSONファイルへ遅延書き込みするクラス。
+
+    mark_dirty() で変更を通知すると、delay 秒後に snapshot() の結果を
+    スレッドプールでまとめて書き込む。書き込みに失敗した場合は
+    delay 秒後に再試行する。確実に残したい場合は flush() を待つ。
+    """
+
+    def __init__(self, path: Path, snapshot: Callable[[], Any], delay: float = 5.0, label: str = "状態"):
+        """
+        Args:
+            path: 保存先のJSONファイル
+            snapshot: 保存する内容を返す関数（event loop 上で呼ばれる）
+            delay: 変更からファイルへ書き込むまでの秒数
+            label: エラーログに出す名前
+        """
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.delay = delay
+        self.label = label
+        self._dirty = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def dirty(self) -> bool:
+        """未保存の変更があるか"""
+        return self._dirty.is_set()
+
+    async def flush(self):
+        """現在の状態を即座にファイルへ書き込む。"""
+        async with self._write_lock:
+            data = self.snapshot()
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, write_json_atomic, self.path, data)
+            except OSError as e:
+                print(f"❌ {self.label}保存エラー: {e}")
+                raise
+
+    async def _run_writer(self):
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.delay)
+            self._dirty.clear()
+            try:
+                await self.flush()
+            except OSError:
+                # 変更ありのまま残し、delay 秒後にもう一度書き込む
+                self._dirty.set()
+
+    def mark_dirty(self):
+        """変更を通知し、遅延書き込みを予約する。"""
+        self._dirty.set()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run_writer())
+
+    async def close(self):
+        """
+        遅延書き込みを停止し、未保存の変更があれば書き込む。
+
+        Raises:
+            OSError: 最後の書き込みに失敗した場合
+        """
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        if self._dirty.is_set():
+            self._dirty.clear()
+            await self.flush()
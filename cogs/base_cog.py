@@ -4,9 +4,11 @@ import json
 import re
 from pathlib import Path
 from typing import Optional, Dict, List
-import requests
 from bs4 import BeautifulSoup
+import discord
 from discord.ext import commands
+from cogs._lodestone_cache import LodestoneCache
+from cogs._lodestone_client import LodestoneClient, LodestoneError
 
 
 class ConfigManager:
@@ -39,57 +41,81 @@ class ConfigManager:
 
 
 class LodestoneSearcher:
-    """Lodestone検索機能を提供するクラス（同期）"""
+    """Lodestone検索機能を提供するクラス"""
 
     BASE_URL = "https://jp.finalfantasyxiv.com/lodestone"
 
-    def __init__(self, config_manager: ConfigManager):
+    def __init__(
+        self,
+        config_manager: ConfigManager,
+        client: LodestoneClient,
+        cache: Optional[LodestoneCache] = None,
+    ):
         self.config_manager = config_manager
+        self.client = client
+        self.cache = cache
 
-    def search_character(self, character_name: str, world_name: str) -> Optional[str]:
+    async def search_character(self, character_name: str, world_name: str) -> Optional[str]:
         """
-        Lodestoneでキャラクターを検索し、IDを返す。
-        ブロッキング処理のため BaseCog.lodestone_search() 経由で呼ぶこと。
+        Lodestoneでキャラクターを検索し、IDを返す（見つからなければ None）。
+        結果はキャッシュし、同じ検索が同時に来た場合は1回の通信にまとめる。
+
+        Raises:
+            LodestoneError: 通信エラー・タイムアウト（キャッシュはしない）
         """
         valid_worlds = self.config_manager.get_worlds_jp()
         if world_name not in valid_worlds:
             print(f"❌ 無効なワールド名: {world_name}")
             return None
 
+        try:
+            if self.cache is None:
+                return await self._fetch_character_id(character_name, world_name)
+            return await self.cache.lookup(
+                character_name, world_name,
+                lambda: self._fetch_character_id(character_name, world_name),
+            )
+        except LodestoneError as e:
+            print(f"❌ Lodestone検索エラー: {e}")
+            raise
+
+    async def _fetch_character_id(self, character_name: str, world_name: str) -> Optional[str]:
+        """
+        Lodestoneに問い合わせてIDを返す（見つからなければ None、通信エラーは例外）。
+        通信は共有の非同期クライアントで行い、HTMLの解析はスレッドプールで行う。
+        """
         params = {"q": character_name, "worldname": world_name}
+        html = await self.client.get_text(f"{self.BASE_URL}/character/", params=params)
 
-        try:
-            url = f"{self.BASE_URL}/character/"
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            entries = soup.find_all("div", class_="entry")
-
-            if not entries:
-                print(f"⚠️ キャラクターが見つかりません: {character_name}@{world_name}")
-                return None
-
-            for entry in entries:
-                name_element = entry.find("p", class_="entry__name")
-                if not name_element:
-                    continue
-                if name_element.get_text(strip=True) == character_name:
-                    link = entry.find("a", href=re.compile(r"/lodestone/character/\d+/"))
-                    if link:
-                        match = re.search(r"/lodestone/character/(\d+)/", link["href"])
-                        if match:
-                            character_id = match.group(1)
-                            print(f"✅ キャラクター発見: {character_name} (ID: {character_id})")
-                            return character_id
-
-            print(f"⚠️ 完全一致するキャラクターが見つかりません: {character_name}")
-            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._parse_character_id, html, character_name, world_name)
 
-        except requests.RequestException as e:
-            print(f"❌ Lodestone検索エラー: {e}")
+    @staticmethod
+    def _parse_character_id(html: str, character_name: str, world_name: str) -> Optional[str]:
+        """検索結果のHTMLから、名前が完全一致するキャラクターのIDを取り出す。"""
+        soup = BeautifulSoup(html, "html.parser")
+        entries = soup.find_all("div", class_="entry")
+
+        if not entries:
+            print(f"⚠️ キャラクターが見つかりません: {character_name}@{world_name}")
             return None
 
+        for entry in entries:
+            name_element = entry.find("p", class_="entry__name")
+            if not name_element:
+                continue
+            if name_element.get_text(strip=True) == character_name:
+                link = entry.find("a", href=re.compile(r"/lodestone/character/\d+/"))
+                if link:
+                    match = re.search(r"/lodestone/character/(\d+)/", link["href"])
+                    if match:
+                        character_id = match.group(1)
+                        print(f"✅ キャラクター発見: {character_name} (ID: {character_id})")
+                        return character_id
+
+        print(f"⚠️ 完全一致するキャラクターが見つかりません: {character_name}")
+        return None
+
     def get_character_url(self, character_id: str) -> str:
         return f"{self.BASE_URL}/character/{character_id}/"
 
@@ -97,10 +123,31 @@ class LodestoneSearcher:
 class BaseCog(commands.Cog):
     """基本的な機能を提供する基底Cogクラス"""
 
+    # Lodestone への接続と検索結果のキャッシュは、全ての BaseCog 派生Cogで共有する
+    _lodestone_client: Optional[LodestoneClient] = None
+    _lodestone_cache: Optional[LodestoneCache] = None
+    _lodestone_users = 0
+
     def __init__(self):
         super().__init__()
         self.config_manager = ConfigManager()
-        self.searcher = LodestoneSearcher(self.config_manager)
+        if BaseCog._lodestone_client is None:
+            config = self.config_manager.config
+            BaseCog._lodestone_client = LodestoneClient(
+                limit_per_host=int(config.get("LODESTONE_MAX_CONNECTIONS", 4)),
+                timeout=float(config.get("LODESTONE_TIMEOUT_SECONDS", 10)),
+                pool_timeout=float(config.get("LODESTONE_POOL_TIMEOUT_SECONDS", 30)),
+            )
+            BaseCog._lodestone_cache = LodestoneCache(
+                config.get("DATA_FILE_LODESTONE_CACHE", "lodestone_cache.json"),
+                hit_ttl=float(config.get("LODESTONE_CACHE_TTL_DAYS", 30)) * 86400,
+                miss_ttl=float(config.get("LODESTONE_NEGATIVE_TTL_MINUTES", 10)) * 60,
+                max_entries=int(config.get("LODESTONE_CACHE_SIZE", 5000)),
+            )
+        BaseCog._lodestone_users += 1
+        self.searcher = LodestoneSearcher(
+            self.config_manager, BaseCog._lodestone_client, BaseCog._lodestone_cache
+        )
 
     @staticmethod
     def normalize_input(text: str) -> str:
@@ -110,12 +157,30 @@ class BaseCog(commands.Cog):
     async def lodestone_search(self, character_name: str, world_name: str) -> Optional[str]:
         """
         Lodestoneでキャラクターを非同期検索。
-        同期 HTTP リクエストをスレッドプールで実行し、event loop をブロックしない。
+        共有クライアントの接続を使い回す。同時接続数を超える分は一定時間まで空きを待ち、
+        待ちきれない場合や通信エラーは LodestoneError を投げる（「見つからない」とは区別する）。
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, self.searcher.search_character, character_name, world_name
-        )
+        return await self.searcher.search_character(character_name, world_name)
 
     def get_lodestone_url(self, character_id: str) -> str:
         return self.searcher.get_character_url(character_id)
+
+    @staticmethod
+    def lodestone_error_embed() -> discord.Embed:
+        """Lodestone に問い合わせできなかった場合の案内"""
+        return discord.Embed(
+            title="⚠️ Lodestone に接続できませんでした",
+            description="Lodestone が混雑しているか、応答がありません。\nしばらくしてからもう一度お試しください。",
+            color=discord.Color.orange()
+        )
+
+    async def cog_unload(self):
+        """最後の BaseCog 派生Cogがアンロードされたら、キャッシュを保存して共有クライアントを閉じます。"""
+        BaseCog._lodestone_users -= 1
+        if BaseCog._lodestone_users <= 0 and BaseCog._lodestone_client is not None:
+            client, BaseCog._lodestone_client = BaseCog._lodestone_client, None
+            cache, BaseCog._lodestone_cache = BaseCog._lodestone_cache, None
+            BaseCog._lodestone_users = 0
+            if cache is not None:
+                await cache.close()
+            await client.close()
@@ -1,9 +1,16 @@
 # cogs/freetalk_cog.py
-import os
+import asyncio
 from typing import Optional
 from discord.ext import commands
-from google import genai
 from google.genai import types
+from cogs.base_cog import ConfigManager
+from cogs._answer_cache import AnswerCache
+from cogs._chat_backend import ChatBackend, create_backend
+from cogs._chat_context import ContextCompactor, estimate_tokens
+from cogs._chat_sessions import ChatSession, ChatSessionManager
+from cogs._chat_tools import LIVE_DATA_FUNCTIONS, SEARCH_INSTRUCTION, TOOL_INSTRUCTION, ChatTools
+from cogs._fair_scheduler import FairScheduler, SchedulerBusy, Superseded
+from cogs._stream_reply import StreamingReply
 
 
 class ChatPersonality:
@@ -38,95 +45,255 @@ class ChatPersonality:
     }
 
 
+# 回答をキャッシュする性格（検索付きで同じ質問が多いもの）
+CACHEABLE_MODES = {"normal"}
+
+# モード名 → 性格設定
+PERSONALITIES = {
+    "yankee": ChatPersonality.YANKEE,
+    "normal": ChatPersonality.NORMAL,
+    "tsundere": ChatPersonality.TSUNDERE_JK,
+}
+
+
 class FreeTalkCog(commands.Cog):
     """
     AIを使ったフリートーク機能を提供するCogクラス
     複数の性格モードでユーザーと対話できる
     """
     
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, backend: Optional[ChatBackend] = None):
         """
         FreeTalkCogのコンストラクタ
         
         Args:
             bot: Botのインスタンス
+            backend: チャットの実装（省略時は設定の FREETALK_BACKEND から決める）
         """
         self.bot = bot
-        self.api_key = os.environ.get("AI_API_KEY", "")
-        if not self.api_key:
-            raise KeyError("AI_API_KEY が環境変数に設定されていません（.env を確認してください）")
-        
-        self._client: genai.Client | None = None
-
-        # 各性格のチャットを初期化
-        self.chats: dict = {
-            "yankee": self._create_chat(ChatPersonality.YANKEE),
-            "normal": self._create_chat(ChatPersonality.NORMAL),
-            "tsundere": self._create_chat(ChatPersonality.TSUNDERE_JK)
-        }
-
-    def _ensure_client(self) -> genai.Client:
-        """クライアントが閉じていれば再生成して返す。"""
-        if self._client is None:
-            self._client = genai.Client(api_key=self.api_key)
-        return self._client
-
-    def _create_chat(self, personality: dict) -> any:
-        config_params = {
-            "system_instruction": personality["system_instruction"],
-            "max_output_tokens": 2000,
-            "top_k": 2,
-            "top_p": 0.5,
-            "temperature": 0.5
-        }
-
-        if personality.get("use_search", False):
-            config_params["tools"] = [types.Tool(google_search=types.GoogleSearch())]
-
-        return self._ensure_client().chats.create(
-            model='gemini-2.5-flash',
-            config=types.GenerateContentConfig(**config_params)
+        config = ConfigManager().config
+        self.backend = backend or create_backend(config)
+
+        # 1回の応答を待つ上限（秒）
+        self.response_timeout = float(config.get("FREETALK_TIMEOUT_SECONDS", 60))
+        # 同時に処理するAIリクエスト数（全体・性格ごと）と、ユーザーごとの待ち行列の上限。
+        # 空きが出たら待っているユーザーを順番に処理する
+        mode_concurrency = int(config.get("FREETALK_MODE_CONCURRENCY", 2))
+        self.scheduler = FairScheduler(
+            max_concurrency=int(config.get("FREETALK_MAX_CONCURRENCY", 4)),
+            max_queue_per_user=int(config.get("FREETALK_USER_QUEUE", 3)),
+            max_queue=int(config.get("FREETALK_MAX_QUEUE", 50)),
+            group_limits={mode: mode_concurrency for mode in PERSONALITIES},
         )
-    
+        # 応答待ちのリクエスト（アンロード時にキャンセルする）
+        self._inflight: set[asyncio.Task] = set()
+
+        # 価格・キャラクター検索は Bot 内のデータを関数呼び出しで AI に渡す
+        self.tools = ChatTools(bot, search=self.backend.search)
+        self.use_local_tools = bool(config.get("FREETALK_LOCAL_TOOLS", True))
+        self.max_tool_rounds = max(int(config.get("FREETALK_TOOL_ROUNDS", 3)), 1)
+
+        # 会話は (チャンネル, 性格) ごと。FREETALK_SESSION_SCOPE を "user" にするとユーザーごと
+        self.session_scope = config.get("FREETALK_SESSION_SCOPE", "channel")
+        self.sessions = ChatSessionManager(
+            factory=lambda mode: self._create_chat(PERSONALITIES[mode]),
+            max_sessions=int(config.get("FREETALK_MAX_SESSIONS", 200)),
+            idle_ttl=float(config.get("FREETALK_SESSION_TTL_MINUTES", 30)) * 60,
+        )
+        # 会話の最初の質問に限り、同じ質問への回答を使い回す
+        self.answer_cache = AnswerCache(
+            max_entries=int(config.get("FREETALK_CACHE_SIZE", 500)),
+            ttl=float(config.get("FREETALK_CACHE_TTL_MINUTES", 360)) * 60,
+        )
+        # 履歴が長くなった会話は、直近の発言を残して古い部分を要約に置き換える
+        self.compactor = ContextCompactor(
+            summarize=self.backend.summarize,
+            rebuild=lambda mode, history: self._create_chat(PERSONALITIES[mode], history),
+            budget_tokens=int(config.get("FREETALK_CONTEXT_TOKENS", 6000)),
+            keep_turns=int(config.get("FREETALK_KEEP_TURNS", 6)),
+        )
+
+    def _create_chat(self, personality: dict, history: Optional[list] = None) -> any:
+        system_instruction = personality["system_instruction"]
+        tools = None
+
+        use_search = personality.get("use_search", False)
+        declarations = self.tools.declarations(web_search=use_search) if self.use_local_tools else []
+        if declarations:
+            # 関数呼び出しと Google 検索は同じリクエストで併用できないため、
+            # 検索付きの性格では検索も関数（web_search）として呼び出させる
+            system_instruction += "\n" + TOOL_INSTRUCTION
+            if use_search:
+                system_instruction += SEARCH_INSTRUCTION
+            tools = [types.Tool(function_declarations=declarations)]
+        elif use_search:
+            tools = [types.Tool(google_search=types.GoogleSearch())]
+
+        return self.backend.create_chat(system_instruction, tools, history)
+
+    def _session_key(self, ctx: commands.Context, mode: str) -> tuple:
+        """コンテキストから会話セッションのキーを決める。"""
+        owner = ctx.author.id if self.session_scope == "user" else ctx.channel.id
+        return (owner, mode)
+
     async def _send_ai_message(
         self, 
         ctx: commands.Context, 
-        chat: any, 
-        message: str,
-        empty_message: str
+        mode: str,
+        message: str
     ) -> None:
         """
         AIにメッセージを送信して応答を返す共通処理
+
+        会話の最初の質問がキャッシュ済みなら、待ち行列に並ばずに即答する。
+        全体の同時実行数を超える場合はユーザーごとの待ち行列に並び、順番に処理する。
+        待ち行列が一杯なら即座に混雑を伝え、同じチャンネルで同じユーザーが
+        待機中に新しく送った場合は古い方を取り消す。
+        response_timeout 秒を超えた応答は打ち切る。
         
         Args:
             ctx: コマンドのコンテキスト
-            chat: 使用するチャットオブジェクト
+            mode: 性格モード（yankee, normal, tsundere）
             message: ユーザーのメッセージ
-            empty_message: メッセージが空の場合の返信
         """
         if not message:
-            await ctx.reply(empty_message)
+            await ctx.reply(PERSONALITIES[mode]["empty_message"])
             return
         
-        async with ctx.typing():
+        task = asyncio.current_task()
+        self._inflight.add(task)
+        try:
+            if await self._reply_from_cache(ctx, mode, message):
+                return
+            async with self.scheduler.slot(ctx.author.id, (ctx.author.id, ctx.channel.id), group=mode):
+                await self._reply_with_ai(ctx, mode, message)
+        except SchedulerBusy:
+            await ctx.reply(
+                "🚦 ただいま混み合っています。少し待ってからもう一度お試しください。",
+                mention_author=False
+            )
+        except Superseded:
+            # 新しいメッセージの方に応答する
+            pass
+        finally:
+            self._inflight.discard(task)
+
+    async def _reply_from_cache(self, ctx: commands.Context, mode: str, message: str) -> bool:
+        """
+        前の発言に依存しない（会話の最初の）質問で、回答がキャッシュ済みなら即答する。
+        AIを呼ばないため、実行枠は取らない。
+
+        Returns:
+            キャッシュから答えた場合は True
+        """
+        if mode not in CACHEABLE_MODES:
+            return False
+        key = self._session_key(ctx, mode)
+        session = self.sessions.peek(key)
+        if session is not None and (session.busy or session.chat.get_history(curated=True)):
+            return False
+        cached = self.answer_cache.get(message)
+        if not cached:
+            return False
+
+        # 処理中の発言が無いことは確認済みのため、順番待ちは発生しない
+        async with self.sessions.turn(key) as session:
+            # 続きの会話のために、キャッシュから答えたやり取りも履歴に残す
+            session.chat = self._create_chat(PERSONALITIES[mode], history=[
+                types.Content(role="user", parts=[types.Part(text=message)]),
+                types.Content(role="model", parts=[types.Part(text=cached)]),
+            ])
+            session.context_tokens = estimate_tokens(session.chat.get_history(curated=True))
+
+            reply = StreamingReply(ctx)
+            await reply.start()
+            reply.append(cached)
             try:
-                response = chat.send_message(message)
-                ai_reply = response.text
-                
-                if not ai_reply:
-                    await ctx.reply("❌ AIからの応答が取得できませんでした。")
-                    return
-                
-                # Discord の文字数制限対策
-                if len(ai_reply) > 2000:
-                    ai_reply = ai_reply[:1900] + "\n\n...(文字数制限のため省略)"
-                
-                await ctx.reply(ai_reply)
-                
-            except Exception as e:
-                print(f"❌ AI応答エラー: {e}")
-                await ctx.reply("❌ エラーが発生しました。もう一度お試しください。")
-    
+                await reply.finish(notice="💾 *以前の同じ質問への回答です*")
+            except asyncio.CancelledError:
+                await reply.fail("⚠️ 応答を中断しました。")
+                raise
+        return True
+
+    async def _reply_with_ai(self, ctx: commands.Context, mode: str, message: str) -> None:
+        """
+        ストリーミングで応答を受け取り、プレースホルダーの返信を逐次編集して表示する。
+        2000文字を超える応答は続きのメッセージに分けて送る。
+        """
+        reply = StreamingReply(ctx)
+        await reply.start()
+        try:
+            # 同じ会話の発言は順番に処理し、別の会話は並行して処理する
+            async with self.sessions.turn(self._session_key(ctx, mode)) as session:
+                # 前の発言に依存しない（会話の最初の）質問だけをキャッシュの対象にする
+                cacheable = mode in CACHEABLE_MODES and not session.chat.get_history(curated=True)
+                used_live_data = await asyncio.wait_for(
+                    self._stream_to(reply, session, message),
+                    timeout=self.response_timeout,
+                )
+                # 価格などその時点のデータを使った回答は使い回さない
+                if cacheable and not used_live_data:
+                    self.answer_cache.put(message, reply.text)
+            # 履歴が予算を超えていれば、次の発言までに裏で要約しておく
+            self.compactor.maybe_schedule(session)
+        except asyncio.TimeoutError:
+            print(f"⌛ AI応答タイムアウト ({mode}, {self.response_timeout:g}秒)")
+            await reply.fail("⌛ AIの応答に時間がかかりすぎたため中断しました。もう一度お試しください。")
+            return
+        except asyncio.CancelledError:
+            await reply.fail("⚠️ 応答を中断しました。")
+            raise
+        except Exception as e:
+            print(f"❌ AI応答エラー: {e}")
+            await reply.fail("❌ エラーが発生しました。もう一度お試しください。")
+            return
+
+        if not reply.text:
+            await reply.fail("❌ AIからの応答が取得できませんでした。")
+            return
+        await reply.finish()
+
+    async def _stream_to(self, reply: StreamingReply, session: ChatSession, message: str) -> bool:
+        """
+        ストリーミング生成の各チャンクを reply に追記し、履歴のトークン数を記録する。
+        AIが関数を呼び出した場合は Bot 内で実行して結果を返し、続きの応答を受け取る。
+
+        Returns:
+            その時点のデータ（価格・キャラクターなど）を返す関数の結果を使って回答した場合は True
+        """
+        usage = None
+        used_live_data = False
+        pending = message
+        for round_number in range(self.max_tool_rounds + 1):
+            calls = []
+            stream = await session.chat.send_message_stream(pending)
+            async for chunk in stream:
+                reply.append(chunk.text or "")
+                calls += chunk.function_calls or []
+                usage = chunk.usage_metadata or usage
+            if not calls:
+                break
+            if round_number == self.max_tool_rounds:
+                # 上限を超えて呼び出しが続く場合は打ち切り、応答のない関数呼び出しを履歴から外す
+                # （残すと次の発言がAPIエラーになる）
+                print(f"⚠️ 関数呼び出しが{self.max_tool_rounds}回を超えたため打ち切りました {session.key}")
+                history = session.chat.get_history(curated=True)
+                session.chat = self._create_chat(PERSONALITIES[session.mode], history=history[:-1])
+                break
+
+            used_live_data = used_live_data or any(call.name in LIVE_DATA_FUNCTIONS for call in calls)
+            results = await asyncio.gather(*(self.tools.call(call.name, call.args) for call in calls))
+            pending = [
+                types.Part.from_function_response(name=call.name, response=result)
+                for call, result in zip(calls, results)
+            ]
+
+        if usage and usage.prompt_token_count:
+            session.context_tokens = usage.prompt_token_count + (usage.candidates_token_count or 0)
+        else:
+            session.context_tokens = estimate_tokens(session.chat.get_history(curated=True))
+        return used_live_data
+
     @commands.command(name="ft", aliases=["freetalk"])
     async def freetalk_yankee(self, ctx: commands.Context, *, message: Optional[str] = None):
         """
@@ -135,12 +302,7 @@ class FreeTalkCog(commands.Cog):
         使い方: !ft <メッセージ>
         例: !ft おはよう
         """
-        await self._send_ai_message(
-            ctx, 
-            self.chats["yankee"], 
-            message,
-            ChatPersonality.YANKEE["empty_message"]
-        )
+        await self._send_ai_message(ctx, "yankee", message)
     
     @commands.command(name="ftn", aliases=["freetalk_normal"])
     async def freetalk_normal(self, ctx: commands.Context, *, message: Optional[str] = None):
@@ -150,12 +312,7 @@ class FreeTalkCog(commands.Cog):
         使い方: !ftn <メッセージ>
         例: !ftn 極ゴルベーザの攻略を教えて
         """
-        await self._send_ai_message(
-            ctx, 
-            self.chats["normal"], 
-            message,
-            ChatPersonality.NORMAL["empty_message"]
-        )
+        await self._send_ai_message(ctx, "normal", message)
     
     @commands.command(name="ftjk", aliases=["freetalk_jk", "tsundere"])
     async def freetalk_tsundere(self, ctx: commands.Context, *, message: Optional[str] = None):
@@ -165,12 +322,7 @@ class FreeTalkCog(commands.Cog):
         使い方: !ftjk <メッセージ>
         例: !ftjk こんにちは
         """
-        await self._send_ai_message(
-            ctx, 
-            self.chats["tsundere"], 
-            message,
-            ChatPersonality.TSUNDERE_JK["empty_message"]
-        )
+        await self._send_ai_message(ctx, "tsundere", message)
     
     @commands.command(name="reset_chat", hidden=True)
     @commands.is_owner()
@@ -181,29 +333,55 @@ class FreeTalkCog(commands.Cog):
         使い方: !reset_chat [mode]
         mode: yankee, normal, tsundere, all (デフォルト: all)
         """
-        modes_to_reset = []
-        
         if mode == "all":
-            modes_to_reset = ["yankee", "normal", "tsundere"]
-        elif mode in self.chats:
+            modes_to_reset = list(PERSONALITIES)
+        elif mode in PERSONALITIES:
             modes_to_reset = [mode]
         else:
             await ctx.reply(f"❌ 無効なモード: {mode}\n使用可能: yankee, normal, tsundere, all")
             return
         
         # クライアントごと作り直すことで接続問題も解消する
-        self._client = None
+        self.backend.reset()
 
-        for mode_name in modes_to_reset:
-            personality = {
-                "yankee": ChatPersonality.YANKEE,
-                "normal": ChatPersonality.NORMAL,
-                "tsundere": ChatPersonality.TSUNDERE_JK
-            }[mode_name]
-
-            self.chats[mode_name] = self._create_chat(personality)
+        # セッションは次の発言時に新しいクライアントで作り直される
+        removed = sum(self.sessions.reset(mode_name) for mode_name in modes_to_reset)
+        if CACHEABLE_MODES & set(modes_to_reset):
+            self.answer_cache.clear()
         
-        await ctx.reply(f"✅ チャット履歴をリセットしました: {', '.join(modes_to_reset)}")
+        await ctx.reply(
+            f"✅ チャット履歴をリセットしました: {', '.join(modes_to_reset)} ({removed}セッション)"
+        )
+
+    @commands.command(name="ft_sessions", hidden=True)
+    @commands.is_owner()
+    async def ft_sessions(self, ctx: commands.Context):
+        """
+        📊 フリートークの会話セッション数を表示します（Bot所有者のみ）
+
+        使い方: !ft_sessions
+        """
+        self.sessions.prune()
+        sessions = self.sessions
+        await ctx.reply(
+            f"🧠 バックエンド: {self.backend.name}\n"
+            f"📊 会話セッション: {len(sessions)}/{sessions.max_sessions}"
+            f"（作成 {sessions.created} / 期限切れ {sessions.expired} / 上限超過で破棄 {sessions.evicted}）\n"
+            f"🗜️ 要約: {self.compactor.compactions}回（失敗 {self.compactor.failures}回 / 実行中 {self.compactor.pending()}件）\n"
+            f"🚦 実行中 {self.scheduler.running}/{self.scheduler.max_concurrency} / 待機 {self.scheduler.queued()}件"
+            f"（混雑で拒否 {self.scheduler.rejected} / 新しい発言で取消 {self.scheduler.superseded}）\n"
+            f"🔧 関数呼び出し: {sum(self.tools.calls.values())}回（失敗 {self.tools.failures}回）\n"
+            f"💾 回答キャッシュ: {len(self.answer_cache)}件 / ヒット率 {self.answer_cache.hit_rate:.0%}"
+            f"（{self.answer_cache.hits}/{self.answer_cache.hits + self.answer_cache.misses}）",
+            mention_author=False
+        )
+
+    async def cog_unload(self):
+        """Cogアンロード時に応答待ちのリクエストを中断し、AIクライアントの接続を閉じます。"""
+        for task in list(self._inflight):
+            task.cancel()
+        await self.compactor.close()
+        await self.backend.close()
 
 
 async def setup(bot: commands.Bot):
@@ -107,6 +107,9 @@ class HelpCog(commands.Cog):
             "myprofile": "profile",
             "自分": "profile",
             "x": "x",
+            "x_follow": "x",
+            "x_unfollow": "x",
+            "x_subs": "x",
             "ping": "bot",
             "p": "bot",
             "info": "bot",
@@ -164,10 +167,14 @@ class HelpCog(commands.Cog):
             embed = self._topic_embed(
                 "🐦 FF14公式X",
                 (
-                    "`!X [件数]`\n\n"
+                    "`!X [件数] [アカウント]`\n"
+                    "`!x_subs` - このサーバーの通知購読一覧\n"
+                    "`!x_follow <アカウント> [#チャンネル]` - 通知を追加（管理者）\n"
+                    "`!x_unfollow <アカウント> [#チャンネル]` - 通知を解除（管理者）\n\n"
                     "例:\n"
                     "`!X`\n"
-                    "`!X 5`"
+                    "`!X 5`\n"
+                    "`!X 3 FF_XIV_EN`"
                 )
             )
         elif key == "bot":
@@ -1,6 +1,8 @@
 # cogs/item_price_cog.py
 import asyncio
+import itertools
 import time
+from datetime import datetime
 import discord
 from discord.ext import commands
 import os
@@ -46,13 +48,109 @@ DC_SHORT: dict[str, str] = {
 }
 
 
+class ItemCatalog:
+    """
+    アイテムDBの読み取り専用スナップショット。
+
+    検索用インデックスを持ち、構築後は変更しない。更新時は新しい
+    スナップショットを作って参照を差し替えるため、検索中の処理は
+    古いバージョンのまま最後まで完了できる。
+    """
+
+    def __init__(self, items: dict, version: int):
+        self.items = items
+        self.version = version
+        self.built_at = datetime.now()
+        self.build_seconds = 0.0
+        # 完全一致用: ("jp", item_jp) / ("en", item_en.lower()) → (並び順, item_id)。
+        # 同じ名前は最初に出てきたアイテムだけを記録する
+        self._exact: dict[tuple[str, str], tuple[int, str]] = {}
+        # 部分一致用: (item_id, item_jp, item_en, item_en.lower())
+        self._entries: list[tuple[str, str, str, str]] = []
+
+    def _index(self, items: dict):
+        for item_id, details in items.items():
+            jp = details.get("item_jp", "")
+            en = details.get("item_en", "")
+            en_lower = en.lower()
+            position = len(self._entries)
+            self._exact.setdefault(("jp", jp), (position, item_id))
+            self._exact.setdefault(("en", en_lower), (position, item_id))
+            self._entries.append((item_id, jp, en, en_lower))
+
+    @staticmethod
+    def _file_order(items: dict) -> dict:
+        """アイテムDBファイルと同じ並び（item_n の昇順、ItemUpdateCog が保存する順）"""
+        return dict(sorted(items.items(), key=lambda item: int(item[0])))
+
+    @classmethod
+    def build(cls, items: dict, version: int) -> "ItemCatalog":
+        """全アイテムからインデックスを構築する。"""
+        start = time.perf_counter()
+        catalog = cls(items, version)
+        catalog._index(items)
+        catalog.build_seconds = time.perf_counter() - start
+        return catalog
+
+    def with_delta(self, new_items: dict, version: int) -> "ItemCatalog":
+        """
+        追加分だけをインデックスに反映した新しいスナップショットを返す。
+
+        並び順（完全一致で同名のアイテムがある場合の優先順と部分一致の候補順）は
+        更新後のファイルを読み直した場合と同じにする。そのため、既存IDの書き換えや
+        既存のアイテムより前に並ぶIDの追加を含む場合は全件再構築する。
+        """
+        new_items = self._file_order(new_items)
+        last_id = next(reversed(self.items), None)
+        if any(item_id in self.items for item_id in new_items) or (
+            new_items and last_id is not None and int(next(iter(new_items))) < int(last_id)
+        ):
+            return self.build(self._file_order({**self.items, **new_items}), version)
+
+        start = time.perf_counter()
+        catalog = ItemCatalog({**self.items, **new_items}, version)
+        catalog._exact = dict(self._exact)
+        catalog._entries = list(self._entries)
+        catalog._index(new_items)
+        catalog.build_seconds = time.perf_counter() - start
+        return catalog
+
+    def find(self, query: str):
+        """アイテム名（日本語/英語）で検索。exact / partial / none を返す。"""
+        if not self.items:
+            return "none", None
+        lower = query.lower()
+        # 日本語名・英語名のどちらで一致しても、並び順が先のアイテムを返す
+        hits = [hit for hit in (self._exact.get(("jp", query)), self._exact.get(("en", lower))) if hit]
+        if hits:
+            _, item_id = min(hits)
+            details = self.items[item_id]
+            return "exact", (item_id, details.get("item_jp", ""), details.get("item_en", ""))
+        matches = [
+            (iid, jp, en)
+            for iid, jp, en, en_lower in self._entries
+            if query in jp or lower in en_lower
+        ]
+        return ("partial", matches) if matches else ("none", None)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
 class ItemCog(commands.Cog):
     """アイテムの価格情報を Universalis API から取得するCog。"""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.items = self._load_items()
+        self._versions = itertools.count(1)
+        self.catalog = ItemCatalog.build(self._load_items(), next(self._versions))
         self.worlds = self._load_worlds()
+        self._swap_lock = asyncio.Lock()
+
+    @property
+    def items(self) -> dict:
+        """現在公開中のスナップショットのアイテム辞書。"""
+        return self.catalog.items
 
     def _load_items(self):
         try:
@@ -68,21 +166,58 @@ class ItemCog(commands.Cog):
         except (FileNotFoundError, json.JSONDecodeError):
             return []
 
-    def reload_items(self):
-        self.items = self._load_items()
-        return len(self.items)
+    def _build_from_file(self, version: int) -> ItemCatalog:
+        return ItemCatalog.build(self._load_items(), version)
+
+    async def reload_items(self) -> ItemCatalog:
+        """
+        JSONを読み直して新しいスナップショットを公開する。
+        読み込みとインデックス構築はスレッドプールで行い、event loop をブロックしない。
+        """
+        async with self._swap_lock:
+            loop = asyncio.get_event_loop()
+            catalog = await loop.run_in_executor(
+                None, self._build_from_file, next(self._versions)
+            )
+            self.catalog = catalog
+        print(f"[item] カタログ v{catalog.version} を公開 ({len(catalog)}件, {catalog.build_seconds * 1000:.0f}ms)")
+        return catalog
+
+    async def apply_new_items(self, new_items: dict) -> ItemCatalog:
+        """
+        追加アイテムを差分としてインデックスに反映し、新しいスナップショットを公開する。
+        """
+        async with self._swap_lock:
+            base = self.catalog
+            loop = asyncio.get_event_loop()
+            catalog = await loop.run_in_executor(
+                None, base.with_delta, new_items, next(self._versions)
+            )
+            self.catalog = catalog
+        print(
+            f"[item] カタログ v{catalog.version} を公開 "
+            f"(+{len(new_items)}件 / 合計{len(catalog)}件, {catalog.build_seconds * 1000:.0f}ms)"
+        )
+        return catalog
 
     @commands.command(name="item_reload")
     @commands.has_permissions(administrator=True)
     async def reload_items_command(self, ctx: commands.Context):
         """アイテムデータを再読み込みします\nUsage: !item_reload"""
         try:
-            count = self.reload_items()
+            catalog = await self.reload_items()
             embed = discord.Embed(
                 title="✅ アイテムデータ再読み込み完了",
-                description=f"合計 **{count}件** のアイテムを読み込みました。",
+                description=f"合計 **{len(catalog)}件** のアイテムを読み込みました。",
                 color=discord.Color.green()
             )
+            embed.add_field(name="バージョン", value=f"v{catalog.version}", inline=True)
+            embed.add_field(
+                name="構築時間",
+                value=f"{catalog.build_seconds * 1000:.0f}ms",
+                inline=True
+            )
+            embed.set_footer(text=f"構築日時: {catalog.built_at:%Y-%m-%d %H:%M:%S}")
             await ctx.reply(embed=embed, mention_author=False)
         except Exception as e:
             await ctx.reply(f"❌ 再読み込み中にエラーが発生しました: {e}", mention_author=False)
@@ -118,20 +253,8 @@ class ItemCog(commands.Cog):
 
     def _find_item(self, query: str):
         """アイテム名（日本語/英語）で検索。exact / partial / none を返す。"""
-        if not self.items:
-            return "none", None
-        lower = query.lower()
-        for item_id, details in self.items.items():
-            jp = details.get("item_jp", "")
-            en = details.get("item_en", "")
-            if jp == query or en.lower() == lower:
-                return "exact", (item_id, jp, en)
-        matches = [
-            (iid, d.get("item_jp", ""), d.get("item_en", ""))
-            for iid, d in self.items.items()
-            if query in d.get("item_jp", "") or lower in d.get("item_en", "").lower()
-        ]
-        return ("partial", matches) if matches else ("none", None)
+        # 参照を一度だけ読むことで、検索中に差し替えがあっても同じ版で完結する
+        return self.catalog.find(query)
 
     async def _fetch_listings(self, item_id: str, server: str) -> list[dict]:
         """Universalis API からリスト（最大15件）を非同期取得。失敗時は2回までリトライ。"""
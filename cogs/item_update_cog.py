@@ -8,6 +8,7 @@ import re
 import os
 import asyncio
 import aiohttp
+from cogs._progress import ProgressReporter
 
 BASE_URL = "https://universalis.app"
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
@@ -53,6 +54,13 @@ class ItemUpdateCog(commands.Cog):
                 return json.load(f)
         return {}
 
+    def save_items(self, items):
+        """
+        アイテムデータをJSONファイルに保存する
+        """
+        with open(JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=4)
+
     def extract_title(self, text):
         """
         タイトル文字列から " - Universalis" の前の部分を抽出する
@@ -84,7 +92,7 @@ class ItemUpdateCog(commands.Cog):
                 return self.extract_title(title_tag.text)
             return ""
 
-    async def process_new_item(self, session, item_n, url, progress_msg, current, total):
+    async def process_new_item(self, session, item_n, url, reporter: ProgressReporter):
         """
         新しいアイテムを処理し、英語・日本語のタイトルを取得
         """
@@ -92,9 +100,8 @@ class ItemUpdateCog(commands.Cog):
             item_en = await self.get_item_en(session, url)
             item_jp = await self.get_item_jp(session, url)
             
-            # 進捗を更新（5件ごと）
-            if current % 5 == 0:
-                await progress_msg.edit(content=f"🔄 アイテム更新中... ({current}/{total})")
+            # 進捗はメモリ上で更新し、メッセージ編集はreporterがまとめて行う
+            reporter.advance()
             
             return {
                 "link": url,
@@ -103,6 +110,7 @@ class ItemUpdateCog(commands.Cog):
             }
         except Exception as e:
             print(f"Error processing {item_n}: {e}")
+            reporter.advance(failed=True)
             return None
 
     @commands.command(name="item_update")
@@ -152,39 +160,46 @@ class ItemUpdateCog(commands.Cog):
             # 非同期セッションで処理
             async with aiohttp.ClientSession() as session:
                 progress_msg = await ctx.send(f"🔄 アイテム更新中... (0/{new_count})")
+                reporter = ProgressReporter(progress_msg, new_count, label="アイテム更新中")
+                reporter.start()
 
                 # 新しいアイテムを処理（同時に10件まで）
                 semaphore = asyncio.Semaphore(10)
                 
-                async def process_with_semaphore(item_n, url, idx):
+                async def process_with_semaphore(item_n, url):
                     async with semaphore:
                         return item_n, await self.process_new_item(
-                            session, item_n, url, progress_msg, idx + 1, new_count
+                            session, item_n, url, reporter
                         )
                 
                 # 全タスクを作成
                 tasks = [
-                    process_with_semaphore(item_n, url, idx)
-                    for idx, (item_n, url) in enumerate(new_items.items())
+                    process_with_semaphore(item_n, url)
+                    for item_n, url in new_items.items()
                 ]
                 
                 # 全タスクを実行
-                results = await asyncio.gather(*tasks)
+                try:
+                    results = await asyncio.gather(*tasks)
+                finally:
+                    await reporter.stop(flush=False)
                 
                 # 結果を統合
+                added_items = {}
                 for item_n, item_data in results:
                     if item_data:
                         existing_items[item_n] = item_data
+                        added_items[item_n] = item_data
 
             # JSONファイルを保存（item_n順にソート）
             sorted_items = dict(sorted(existing_items.items(), key=lambda x: int(x[0])))
-            with open(JSON_FILE, "w", encoding="utf-8") as f:
-                json.dump(sorted_items, f, ensure_ascii=False, indent=4)
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.save_items, sorted_items)
 
-            # ItemCogのデータを再読み込み
+            # ItemCogへ追加分だけを差分反映（検索を止めずにスナップショットを差し替え）
             item_cog = self.bot.get_cog("ItemCog")
             if item_cog:
-                item_cog.reload_items()
+                await item_cog.apply_new_items(added_items)
 
             # 完了メッセージ
             final_embed = discord.Embed(
@@ -194,6 +209,11 @@ class ItemUpdateCog(commands.Cog):
             )
             final_embed.add_field(name="更新後のアイテム数", value=f"{len(sorted_items)}件", inline=True)
             final_embed.add_field(name="🔄 状態", value="アイテム検索に即座に反映されました", inline=True)
+            final_embed.add_field(
+                name="⏱️ 所要時間",
+                value=ProgressReporter.format_duration(reporter.elapsed),
+                inline=True
+            )
             
             await progress_msg.delete()
             await status_msg.edit(content=None, embed=final_embed)
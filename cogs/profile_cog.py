@@ -6,6 +6,7 @@ from typing import Dict, Optional
 from discord.ext import commands
 import discord
 from cogs.base_cog import BaseCog
+from cogs._lodestone_client import LodestoneError
 
 
 class ProfileManager:
@@ -106,7 +107,11 @@ class ProfileCog(BaseCog):
         
         # Lodestoneで検索
         async with ctx.typing():
-            character_id = await self.lodestone_search(full_name, server)
+            try:
+                character_id = await self.lodestone_search(full_name, server)
+            except LodestoneError:
+                await ctx.reply(embed=self.lodestone_error_embed(), mention_author=False)
+                return
 
             if not character_id:
                 embed = discord.Embed(
@@ -182,7 +187,11 @@ class ProfileCog(BaseCog):
         character_id = profile.get("character_id")
         if not character_id:
             async with ctx.typing():
-                character_id = await self.lodestone_search(full_name, server)
+                try:
+                    character_id = await self.lodestone_search(full_name, server)
+                except LodestoneError:
+                    await ctx.reply(embed=self.lodestone_error_embed(), mention_author=False)
+                    return
                 if character_id:
                     profile["character_id"] = character_id
                     self.profile_manager.set(str(ctx.author.id), profile)
@@ -3,6 +3,7 @@ from typing import Optional
 import discord
 from discord.ext import commands
 from cogs.base_cog import BaseCog
+from cogs._lodestone_client import LodestoneError
 
 
 class SearchCog(BaseCog):
@@ -50,7 +51,11 @@ class SearchCog(BaseCog):
         
         # Lodestoneで検索
         async with ctx.typing():
-            character_id = await self.lodestone_search(full_name, server)
+            try:
+                character_id = await self.lodestone_search(full_name, server)
+            except LodestoneError:
+                await ctx.reply(embed=self.lodestone_error_embed(), mention_author=False)
+                return
             
             if not character_id:
                 embed = discord.Embed(
@@ -88,6 +93,28 @@ class SearchCog(BaseCog):
             await ctx.reply(embed=embed, mention_author=False)
 
 
+    @commands.command(name="lodestone_stats", hidden=True)
+    @commands.is_owner()
+    async def lodestone_stats(self, ctx: commands.Context):
+        """
+        📊 Lodestone検索のキャッシュ状況を表示します（Bot所有者のみ）
+
+        使い方: !lodestone_stats
+        """
+        cache = self.searcher.cache
+        client = self.searcher.client
+        lines = [f"🌐 Lodestoneへの通信: {client.requests}回（エラー {client.errors}回 / 同時接続上限 {client.limit_per_host}）"]
+        if cache is not None:
+            lookups = cache.hits + cache.negative_hits + cache.coalesced + cache.misses
+            lines.append(
+                f"💾 検索キャッシュ: {len(cache)}件 / ヒット率 {cache.hit_rate:.0%}"
+                f"（{lookups - cache.misses}/{lookups}）\n"
+                f"　ヒット {cache.hits} / 未発見のヒット {cache.negative_hits} / "
+                f"同時検索の相乗り {cache.coalesced} / 問い合わせ {cache.misses}"
+            )
+        await ctx.reply("\n".join(lines), mention_author=False)
+
+
 async def setup(bot: commands.Bot):
     """このCogをBotに登録"""
     try:
@@ -3,17 +3,160 @@ import os
 import json
 import re
 import asyncio
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Set
 from urllib.parse import quote
 import xml.etree.ElementTree as ET
 import aiohttp
+import discord
 from discord.ext import commands, tasks
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+from cogs._browser_pool import BrowserPool, StageTimer
+from cogs._feed_client import FeedClient, FeedNotModified
+from cogs._notifier import NotificationDispatcher
+from cogs._poll_schedule import AdaptivePollSchedule
+from cogs._source_health import SourceHealthTracker
+from cogs._tweet_api import SYNDICATION_TIMELINE_URL, TweetApiClient, build_tweet_embed
+from cogs._tweet_state import TweetStateStore
+from cogs._write_behind import write_json_atomic
 
 # プロジェクトルートからの相対パスでファイルパスを解決
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 
+TWEET_SELECTOR = 'article[data-testid="tweet"]'
+# !X 用にアカウントごとに保持するタイムラインの最大件数
+TIMELINE_CACHE_SIZE = 50
+# 検索・プロフィールのタイムラインを返す GraphQL API
+TIMELINE_API_PATTERN = re.compile(r"/i/api/graphql/[^/]+/(SearchTimeline|UserTweets|UserTweetsAndReplies)")
+
+# 記事ごとのリツイート判定・リンク抽出をブラウザ内でまとめて行うスクリプト
+EXTRACT_TWEETS_SCRIPT = r"""
+(selector) => {
+    const parse = (href) => {
+        const m = href && href.match(/^(?:https?:\/\/[^/]+)?\/([^/?#]+)\/status\/(\d+)/);
+        return m ? { author: m[1], id: m[2] } : null;
+    };
+    const retweetText = /リツイート|リポスト|retweeted|reposted/i;
+    const replyText = /(^|\n)\s*(返信先|Replying to)/;
+
+    const entries = [];
+    const seen = new Set();
+    for (const article of document.querySelectorAll(selector)) {
+        const link = article.querySelector('a[href*="/status/"]');
+        const parsed = link && parse(link.getAttribute('href'));
+        if (!parsed) continue;
+        const social = article.querySelector('[data-testid="socialContext"]');
+        const text = article.innerText || '';
+        entries.push({
+            id: parsed.id,
+            author: parsed.author,
+            is_retweet: !!social || retweetText.test(text.split('\n', 2).join('\n')),
+            is_reply: replyText.test(text),
+            source: 'article',
+        });
+        seen.add(parsed.id);
+    }
+    for (const link of document.querySelectorAll('a[href*="/status/"]')) {
+        const parsed = parse(link.getAttribute('href'));
+        if (!parsed || seen.has(parsed.id)) continue;
+        entries.push({
+            id: parsed.id,
+            author: parsed.author,
+            is_retweet: false,
+            is_reply: false,
+            source: 'link',
+        });
+        seen.add(parsed.id);
+    }
+    return entries;
+}
+"""
+
+
+class SubscriptionRegistry:
+    """
+    Xアカウント → 通知先チャンネルの購読情報を管理するクラス。
+
+    ファイルが無い場合は default の内容で初期化する。
+    アカウント名は大文字小文字を区別せずに扱う。
+    """
+
+    def __init__(self, subscriptions_file: str, default: Dict[str, List[int]]):
+        self.subscriptions_file = Path(subscriptions_file)
+        self._subscriptions: Dict[str, Set[int]] = {}
+        self.load(default)
+
+    def load(self, default: Dict[str, List[int]]) -> Dict[str, Set[int]]:
+        """購読情報を読み込む"""
+        data = default
+        try:
+            if self.subscriptions_file.exists():
+                with open(self.subscriptions_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"❌ 購読情報読み込みエラー: {e}")
+        self._subscriptions = {
+            account: {int(channel_id) for channel_id in channel_ids}
+            for account, channel_ids in data.items()
+        }
+        return self._subscriptions
+
+    def save(self) -> bool:
+        """購読情報を保存（一時ファイル + os.replace で書き込み、途中で壊れないようにする）"""
+        try:
+            write_json_atomic(
+                self.subscriptions_file,
+                {account: sorted(channels) for account, channels in self._subscriptions.items()},
+            )
+            return True
+        except Exception as e:
+            print(f"❌ 購読情報保存エラー: {e}")
+            return False
+
+    def _key(self, account: str) -> str:
+        account = account.lstrip("@")
+        for key in self._subscriptions:
+            if key.lower() == account.lower():
+                return key
+        return account
+
+    def resolve(self, account: str) -> str | None:
+        """購読中のアカウントなら登録済みの表記を、購読していなければ None を返す"""
+        key = self._key(account)
+        return key if self._subscriptions.get(key) else None
+
+    def accounts(self) -> List[str]:
+        """購読チャンネルが1つ以上あるアカウント"""
+        return [account for account, channels in self._subscriptions.items() if channels]
+
+    def channels(self, account: str) -> Set[int]:
+        return set(self._subscriptions.get(self._key(account), set()))
+
+    def add(self, account: str, channel_id: int) -> bool:
+        """購読を追加。既に購読済みなら False"""
+        channels = self._subscriptions.setdefault(self._key(account), set())
+        if channel_id in channels:
+            return False
+        channels.add(channel_id)
+        return self.save()
+
+    def remove(self, account: str, channel_id: int) -> bool:
+        """購読を解除。購読していなければ False"""
+        key = self._key(account)
+        channels = self._subscriptions.get(key)
+        if not channels or channel_id not in channels:
+            return False
+        channels.discard(channel_id)
+        if not channels:
+            del self._subscriptions[key]
+        return self.save()
+
+    def items(self):
+        return self._subscriptions.items()
+
 
 class TweetCog(commands.Cog):
     """
@@ -32,15 +175,80 @@ class TweetCog(commands.Cog):
         with open(CONFIG_PATH, "r", encoding="utf-8") as f:
             config = json.load(f)
         
-        self.channel_id = int(config["CHANNEL_ID"])
-        self.x_user = "FF_XIV_JP"
+        self.x_user = config.get("TWEET_DEFAULT_ACCOUNT", "FF_XIV_JP")
+        subscriptions_file = config.get("DATA_FILE_TWEET_SUBSCRIPTIONS", "tweet_subscriptions.json")
+        self.subscriptions = SubscriptionRegistry(
+            os.path.join(BASE_DIR, subscriptions_file),
+            default={self.x_user: [int(config["CHANNEL_ID"])]},
+        )
         self.check_interval_minutes = max(
             float(config.get("TWEET_CHECK_INTERVAL_MINUTES", 2)),
             1,
         )
         data_file = config.get("DATA_FILE_TWEETS", "sent_tweets.json")
         self.data_file_tweets = os.path.join(BASE_DIR, data_file)
-        self.sent_tweets = self.load_sent_tweets()
+        # 定期チェックで更新し、!X はここから返す（アカウント → {"ids", "fetched_at"}）
+        self.timelines: dict[str, dict] = {}
+        self._timeline_refreshes: dict[str, tuple[asyncio.Task, int]] = {}
+        self.timeline_max_age = float(
+            config.get("TWEET_TIMELINE_MAX_AGE_SECONDS", self.check_interval_minutes * 60 * 2)
+        )
+
+        # 通知済みIDはメモリ上を正とし、ファイルへは遅延書き込みする
+        self.tweet_state = TweetStateStore(self.data_file_tweets, default_account=self.x_user)
+
+        # 投稿の多い時間帯は短く、静かな時間帯は長くするチェック間隔
+        self.schedule = AdaptivePollSchedule(
+            min_minutes=self.check_interval_minutes,
+            max_minutes=float(config.get("TWEET_CHECK_MAX_INTERVAL_MINUTES", 30)),
+            active_windows=config.get("TWEET_ACTIVE_WINDOWS", []),
+        )
+        for account in self.subscriptions.accounts():
+            self.schedule.observe(self.tweet_state.get(account).to_list())
+
+        # 取得元ごとの成功率・応答時間・鮮度（再起動後も保持）
+        health_file = config.get("DATA_FILE_TWEET_SOURCES", "tweet_sources.json")
+        self.source_health = SourceHealthTracker(
+            os.path.join(BASE_DIR, health_file),
+            probe_interval=float(config.get("TWEET_SOURCE_PROBE_MINUTES", 30)) * 60,
+        )
+
+        # ブラウザを使う取得元を追加で開始するまでの待ち時間（秒）
+        self.hedge_delay_seconds = max(
+            float(config.get("TWEET_HEDGE_DELAY_SECONDS", 5)),
+            0,
+        )
+
+        # 取得先のベースURL（オフラインでの計測時はローカルサーバーに向ける）
+        self.nitter_url = config.get("TWEET_NITTER_URL", "https://nitter.net").rstrip("/")
+        self.x_url = config.get("TWEET_X_URL", "https://x.com").rstrip("/")
+        self.vxtwitter_url = config.get("TWEET_VXTWITTER_URL", "https://vxtwitter.com").rstrip("/")
+
+        # Nitterの条件付きGET用の共有クライアントと前回結果（URL → ツイートID）
+        self.feed_client = FeedClient()
+        self._feed_cache: dict[str, list] = {}
+        # ブラウザを使わない埋め込みタイムライン取得（本文・画像も保持し、通知の埋め込みに使う）
+        self.tweet_api = TweetApiClient(
+            self.feed_client,
+            timeline_url=config.get("TWEET_SYNDICATION_URL", SYNDICATION_TIMELINE_URL),
+        )
+
+        # チャンネルごとの送信キュー（チャンネル間は並行、失敗は再試行して記録）
+        deliveries_file = config.get("DATA_FILE_TWEET_DELIVERIES", "tweet_deliveries.json")
+        self.notifier = NotificationDispatcher(
+            os.path.join(BASE_DIR, deliveries_file),
+            max_concurrency=int(config.get("TWEET_NOTIFY_CONCURRENCY", 10)),
+            max_retries=int(config.get("TWEET_NOTIFY_MAX_RETRIES", 3)),
+        )
+        # 届かなかった通知は次回のチェックで再送する: アカウント → チャンネルID → [(ツイートID, 失敗回数)]
+        self.redelivery_attempts = max(int(config.get("TWEET_REDELIVERY_ATTEMPTS", 3)), 1)
+        self._undelivered: Dict[str, Dict[int, List[tuple]]] = {}
+
+        # Playwright系の取得で共有する常駐ブラウザ（初回利用時に起動）
+        self.browser_pool = BrowserPool(
+            max_uses=int(config.get("TWEET_BROWSER_MAX_USES", 50)),
+            max_rss_mb=float(config.get("TWEET_BROWSER_MAX_RSS_MB", 800)),
+        )
         
         # 定期タスクの開始
         self.fetch_tweets_task.change_interval(minutes=self.check_interval_minutes)
@@ -55,115 +263,210 @@ class TweetCog(commands.Cog):
         }
         return sorted(unique_ids, key=lambda tweet_id: int(tweet_id), reverse=True)[:count]
 
-    async def get_latest_tweet_ids(self, username: str, count: int = 2) -> list:
+    def _tweet_sources(self) -> list:
+        """
+        取得元の一覧を優先順に返します。
+
+        cheap=True の取得元（HTTPのみ）は即座に並行実行し、
+        ブラウザを使う取得元はヘッジ遅延後または失敗時に順次追加します。
+        """
+        return [
+            {"key": "nitter_rss", "name": "Nitter RSS", "fetch": self.get_tweet_ids_nitter_rss, "cheap": True},
+            {"key": "nitter_page", "name": "Nitterページ", "fetch": self.get_tweet_ids_nitter_page, "cheap": True},
+            {"key": "syndication", "name": "埋め込みタイムライン", "fetch": self.get_tweet_ids_syndication, "cheap": True},
+            {"key": "search", "name": "X検索", "fetch": self.get_tweet_ids_search_playwright, "cheap": False},
+            {"key": "profile", "name": "プロフィール", "fetch": self.get_tweet_ids_playwright, "cheap": False},
+            {"key": "vxtwitter", "name": "vxTwitter", "fetch": self.get_tweet_ids_vxtwitter, "cheap": False},
+        ]
+
+    async def get_latest_tweet_ids(
+        self, username: str, count: int = 2, known_latest_id: str | None = None
+    ) -> list:
         """
         複数の取得方法を使って最新ツイートIDを取得します。
 
+        軽量な取得元（Nitter）は同時に実行し、ブラウザを使う取得元は
+        hedge_delay 秒経過しても揃わない場合か、他の取得元が失敗した場合にだけ
+        順に開始します。結果が count 件に達した時点で残りはキャンセルします。
         Xの未ログイン向けプロフィールページは古い内容を返すことがあるため、
-        検索の最新タブを優先し、最後にIDの新しい順で正規化します。
+        最後にIDの新しい順で正規化します。
+
+        Args:
+            username: Xのユーザー名
+            count: 取得する件数
+            known_latest_id: 通知済みの最新ID。RSSが 304 を返し、前回結果に
+                これより新しいIDが無い場合は FeedNotModified を送出して打ち切る
         """
         fetch_count = max(count * 3, 10)
         tweet_ids = []
 
-        rss_ids = await self.get_tweet_ids_nitter_rss(username, fetch_count)
-        if rss_ids:
-            print(f"Nitter RSSから{len(rss_ids)}件取得しました")
-            tweet_ids.extend(rss_ids)
+        # スコア順に並べ、連続失敗中の取得元は復旧確認の時期までスキップ
+        sources = self.source_health.rank(self._tweet_sources())
+        waiting = [source for source in sources if not source["cheap"]]
+        running: dict[asyncio.Task, dict] = {}
+        started_at: dict[asyncio.Task, float] = {}
+        results: dict[str, list] = {}
 
-        if len(tweet_ids) >= count:
-            return self._unique_latest_tweet_ids(tweet_ids, count)
+        def start(source: dict):
+            task = asyncio.create_task(source["fetch"](username, fetch_count))
+            running[task] = source
+            started_at[task] = loop.time()
 
-        nitter_ids = await self.get_tweet_ids_nitter_page(username, fetch_count)
-        if nitter_ids:
-            print(f"Nitterページから{len(nitter_ids)}件取得しました")
-            tweet_ids.extend(nitter_ids)
+        loop = asyncio.get_event_loop()
 
-        if len(self._unique_latest_tweet_ids(tweet_ids, count)) >= count:
-            return self._unique_latest_tweet_ids(tweet_ids, count)
+        for source in sources:
+            if source["cheap"]:
+                start(source)
 
-        search_ids = await self.get_tweet_ids_search_playwright(username, fetch_count)
-        if search_ids:
-            print(f"X検索から{len(search_ids)}件取得しました")
-            tweet_ids.extend(search_ids)
+        next_hedge_at = loop.time() + self.hedge_delay_seconds
 
-        if len(tweet_ids) < count:
-            profile_ids = await self.get_tweet_ids_playwright(username, fetch_count)
-            if profile_ids:
-                print(f"プロフィールから{len(profile_ids)}件取得しました")
-                tweet_ids.extend(profile_ids)
+        try:
+            while len(self._unique_latest_tweet_ids(tweet_ids, count)) < count:
+                if not running:
+                    if not waiting:
+                        break
+                    start(waiting.pop(0))
+                    next_hedge_at = loop.time() + self.hedge_delay_seconds
+                    continue
+
+                timeout = max(next_hedge_at - loop.time(), 0) if waiting else None
+                done, _ = await asyncio.wait(
+                    running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
 
-        if len(self._unique_latest_tweet_ids(tweet_ids, count)) < count:
-            print("vxTwitterを試行します...")
-            tweet_ids.extend(await self.get_tweet_ids_vxtwitter(username, fetch_count))
+                failed = False
+                for task in done:
+                    source = running.pop(task)
+                    try:
+                        ids = task.result()
+                    except FeedNotModified as e:
+                        ids = e.tweet_ids
+                        if known_latest_id is not None and all(
+                            int(tweet_id) <= int(known_latest_id) for tweet_id in ids
+                        ):
+                            self.source_health.record(
+                                source["key"], True, loop.time() - started_at[task]
+                            )
+                            raise
+                    except Exception as e:
+                        print(f"{source['name']}取得エラー: {e}")
+                        ids = []
+                    self.source_health.record(
+                        source["key"], bool(ids), loop.time() - started_at[task]
+                    )
+                    if ids:
+                        print(f"{source['name']}から{len(ids)}件取得しました")
+                        tweet_ids.extend(ids)
+                        results[source["key"]] = ids
+                    else:
+                        failed = True
+
+                # 失敗した、またはヘッジ遅延を過ぎた場合は次の取得元を追加
+                if waiting and (failed or loop.time() >= next_hedge_at):
+                    if len(self._unique_latest_tweet_ids(tweet_ids, count)) < count:
+                        source = waiting.pop(0)
+                        print(f"{source['name']}を並行して試行します...")
+                        start(source)
+                        next_hedge_at = loop.time() + self.hedge_delay_seconds
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+            self.source_health.record_freshness(results)
+            self.source_health.mark_dirty()
 
         return self._unique_latest_tweet_ids(tweet_ids, count)
 
+    @staticmethod
+    def _parse_rss_item(item, username: str):
+        """RSSの item 要素から本人のオリジナル投稿のツイートIDを取り出します。"""
+        namespaces = {"dc": "http://purl.org/dc/elements/1.1/"}
+        creator = item.findtext("dc:creator", default="", namespaces=namespaces)
+        link = item.findtext("link", default="")
+        title = item.findtext("title", default="")
+
+        if creator.lower() != f"@{username.lower()}":
+            return None
+        if title.startswith("RT by @"):
+            return None
+
+        match = re.search(rf"/{re.escape(username)}/status/(\d+)", link)
+        if not match:
+            guid = item.findtext("guid", default="")
+            match = re.search(r"(\d{15,})", guid)
+        return match.group(1) if match else None
+
     async def get_tweet_ids_nitter_rss(self, username: str, count: int = 2) -> list:
         """
         NitterのRSSから本人投稿のツイートIDを取得します。
 
         Xの未ログインページは古いHTMLや空DOMを返すことがあるため、
         RSSで取れる場合はこちらを最優先します。
+
+        前回の ETag / Last-Modified を付けた条件付きリクエストを送り、
+        304 の場合は前回の結果を持たせた FeedNotModified を送出します。
+        200 の場合もストリームを逐次解析し、前回取得済みのIDに到達した時点で
+        読み込みを打ち切ります。
         """
         urls = [
-            f"https://nitter.net/{username}/rss",
+            f"{self.nitter_url}/{username}/rss",
         ]
         headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
             "Accept": "application/rss+xml, application/xml, text/xml, */*",
         }
 
-        timeout = aiohttp.ClientTimeout(total=20)
         for url in urls:
+            cached_ids = self._feed_cache.get(url, [])
+            # 前回取得した最大のIDまで読めば、それより古い分は前回結果と同じ。
+            # RSS は count より少ない件数しか返さないことが多いため、前回結果の件数には依存しない
+            stop_at = max((int(tweet_id) for tweet_id in cached_ids), default=0)
             try:
                 print(f"Nitter RSSを取得中: {url}")
-                async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-                    async with session.get(url) as response:
-                        if response.status != 200:
-                            print(f"Nitter RSS取得失敗: HTTP {response.status}")
-                            continue
-                        rss_text = await response.text()
-
-                root = ET.fromstring(rss_text)
-                namespaces = {"dc": "http://purl.org/dc/elements/1.1/"}
-                tweet_ids = []
-                seen_ids = set()
-
-                for item in root.findall(".//item"):
-                    creator = item.findtext("dc:creator", default="", namespaces=namespaces)
-                    link = item.findtext("link", default="")
-                    title = item.findtext("title", default="")
-
-                    if creator.lower() != f"@{username.lower()}":
-                        continue
-                    if title.startswith("RT by @"):
-                        continue
-
-                    match = re.search(rf"/{re.escape(username)}/status/(\d+)", link)
-                    if not match:
-                        guid = item.findtext("guid", default="")
-                        match = re.search(r"(\d{15,})", guid)
-                    if not match:
+                async with self.feed_client.get(url, headers=headers, conditional=bool(cached_ids)) as response:
+                    if response.status == 304:
+                        print("Nitter RSS: 更新なし (304)")
+                        raise FeedNotModified(url, cached_ids[:count])
+                    if response.status != 200:
+                        print(f"Nitter RSS取得失敗: HTTP {response.status}")
                         continue
 
-                    tweet_id = match.group(1)
-                    if tweet_id not in seen_ids:
-                        tweet_ids.append(tweet_id)
-                        seen_ids.add(tweet_id)
-                        print(f"Nitter RSSから取得: {tweet_id}")
-
-                    if len(tweet_ids) >= count:
-                        break
+                    parser = ET.XMLPullParser(events=("end",))
+                    new_ids = []
+                    reached_known = False
+                    async for chunk in response.content.iter_chunked(16384):
+                        parser.feed(chunk)
+                        for _, item in parser.read_events():
+                            if item.tag != "item":
+                                continue
+                            tweet_id = self._parse_rss_item(item, username)
+                            item.clear()
+                            if tweet_id is None or tweet_id in new_ids:
+                                continue
+                            if int(tweet_id) <= stop_at or len(new_ids) >= count:
+                                reached_known = True
+                                break
+                            new_ids.append(tweet_id)
+                            print(f"Nitter RSSから取得: {tweet_id}")
+                        if reached_known:
+                            break
+                    if not reached_known:
+                        parser.close()
 
-                if tweet_ids:
-                    return self._unique_latest_tweet_ids(tweet_ids, count)
+                    if stop_at:
+                        tweet_ids = self._unique_latest_tweet_ids(new_ids + cached_ids, count)
+                    else:
+                        tweet_ids = self._unique_latest_tweet_ids(new_ids, count)
+                    if tweet_ids:
+                        self._feed_cache[url] = tweet_ids
+                        self.feed_client.remember(url, response)
+                        return tweet_ids
 
+            except FeedNotModified:
+                raise
             except ET.ParseError as e:
                 print(f"Nitter RSS解析エラー: {e}")
+                self.feed_client.forget(url)
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 print(f"Nitter RSS通信エラー: {e}")
             except Exception as e:
@@ -177,25 +480,22 @@ class TweetCog(commands.Cog):
 
         RSSでRTを除外した結果、指定件数に届かない場合の補助ルートです。
         """
-        url = f"https://nitter.net/{username}"
+        url = f"{self.nitter_url}/{username}"
         headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         }
 
         try:
             print(f"Nitterページを取得中: {url}")
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        print(f"Nitterページ取得失敗: HTTP {response.status}")
-                        return []
-                    html = await response.text()
+            cached_ids = self._feed_cache.get(url, [])
+            async with self.feed_client.get(url, headers=headers, conditional=len(cached_ids) >= count) as response:
+                if response.status == 304:
+                    print("Nitterページ: 更新なし (304)")
+                    return cached_ids[:count]
+                if response.status != 200:
+                    print(f"Nitterページ取得失敗: HTTP {response.status}")
+                    return []
+                html = await response.text()
 
             tweet_ids = []
             seen_ids = set()
@@ -210,7 +510,11 @@ class TweetCog(commands.Cog):
                 if len(tweet_ids) >= count:
                     break
 
-            return self._unique_latest_tweet_ids(tweet_ids, count)
+            tweet_ids = self._unique_latest_tweet_ids(tweet_ids, count)
+            if tweet_ids:
+                self._feed_cache[url] = tweet_ids
+                self.feed_client.remember(url, response)
+            return tweet_ids
 
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"Nitterページ通信エラー: {e}")
@@ -219,6 +523,28 @@ class TweetCog(commands.Cog):
 
         return []
 
+    async def get_tweet_ids_syndication(self, username: str, count: int = 2) -> list:
+        """
+        埋め込みタイムライン（syndication）のJSONからツイートIDを取得します。
+
+        HTTPのみで本文・画像も同時に取れるため、Playwright系より先に試します。
+        取得した詳細は tweet_api に保持され、通知時の埋め込みに使われます。
+        """
+        try:
+            print(f"埋め込みタイムラインを取得中: @{username}")
+            tweets = await self.tweet_api.fetch_timeline(username, count)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"埋め込みタイムライン通信エラー: {e}")
+            return []
+        except Exception as e:
+            print(f"埋め込みタイムラインエラー: {e}")
+            return []
+
+        tweet_ids = [tweet["id"] for tweet in tweets]
+        for tweet_id in tweet_ids:
+            print(f"埋め込みタイムラインから取得: {tweet_id}")
+        return tweet_ids
+
     async def get_tweet_ids_search_playwright(self, username: str, count: int = 2) -> list:
         """
         X検索の「最新」タブからツイートIDを取得します。
@@ -226,29 +552,10 @@ class TweetCog(commands.Cog):
         プロフィールページの未ログイン表示が数日から1週間ほど遅延する場合の
         メイン回避策です。
         """
-        async with async_playwright() as p:
-            try:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-web-security',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-gpu'
-                    ]
-                )
-            except Exception as e:
-                print(f"検索用ブラウザ起動エラー: {e}")
-                return []
-
-            try:
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
+        try:
+            async with self.browser_pool.lease(
+                viewport={'width': 1920, 'height': 1080}
+            ) as context:
                 page = await context.new_page()
                 await page.set_extra_http_headers({
                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -258,27 +565,23 @@ class TweetCog(commands.Cog):
                 })
 
                 query = quote(f"from:{username} -filter:replies")
-                url = f"https://x.com/search?q={query}&src=typed_query&f=live"
+                url = f"{self.x_url}/search?q={query}&src=typed_query&f=live"
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 print(f"[{timestamp}] {url} にアクセス中...")
 
+                timer = StageTimer("X検索")
                 try:
                     await page.goto(url, wait_until='domcontentloaded', timeout=60000)
                 except PlaywrightTimeout:
                     print("検索ページ読み込みタイムアウト。部分的に読み込まれた内容で続行します...")
+                timer.mark("goto")
 
-                await page.wait_for_timeout(5000)
+                if not await self._wait_for_timeline(page):
+                    print("検索結果の表示を待機中にタイムアウトしました")
+                timer.mark("timeline")
 
-                try:
-                    close_buttons = await page.query_selector_all('[aria-label="閉じる"], [aria-label="Close"]')
-                    for button in close_buttons:
-                        try:
-                            await button.click(timeout=1000)
-                            await page.wait_for_timeout(500)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+                await self._close_popups(page)
+                timer.mark("popup")
 
                 tweet_ids = []
                 seen_ids = set()
@@ -288,52 +591,31 @@ class TweetCog(commands.Cog):
                     if len(tweet_ids) >= count:
                         break
 
-                    articles = await page.query_selector_all('article[data-testid="tweet"]')
-                    print(f"検索で見つかった記事数: {len(articles)}")
+                    entries = await self._extract_tweets(page)
+                    print(f"検索で見つかった記事数: {self._count_articles(entries)}")
 
-                    for article in articles:
+                    for tweet_id in self._filter_tweet_entries(entries, username):
                         if len(tweet_ids) >= count:
                             break
+                        if tweet_id not in seen_ids:
+                            tweet_ids.append(tweet_id)
+                            seen_ids.add(tweet_id)
+                            print(f"検索から取得: {tweet_id}")
 
-                        try:
-                            if await self._is_retweet(article):
-                                continue
-
-                            links = await article.query_selector_all('a[href*="/status/"]')
-                            for link in links:
-                                href = await link.get_attribute('href')
-                                if href and f"/{username}/status/" in href:
-                                    match = re.search(r'/status/(\d+)', href)
-                                    if match:
-                                        tweet_id = match.group(1)
-                                        if tweet_id not in seen_ids:
-                                            tweet_ids.append(tweet_id)
-                                            seen_ids.add(tweet_id)
-                                            print(f"検索から取得: {tweet_id}")
-                                        break
-                        except Exception as e:
-                            print(f"検索記事処理エラー: {e}")
-                            continue
-
+                    timer.mark("extract")
                     if len(tweet_ids) >= count:
                         break
 
                     if attempt < max_attempts - 1:
-                        await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                        await page.wait_for_timeout(3000)
+                        await self._scroll_for_more(page)
+                        timer.mark("scroll")
 
+                print(timer.summary())
                 return self._unique_latest_tweet_ids(tweet_ids, count)
 
-            except Exception as e:
-                print(f"検索スクレイピングエラー: {e}")
-                return []
-
-            finally:
-                try:
-                    await context.close()
-                except Exception:
-                    pass
-                await browser.close()
+        except Exception as e:
+            print(f"検索スクレイピングエラー: {e}")
+            return []
 
     async def get_tweet_ids_playwright(self, username: str, count: int = 2) -> list:
         """
@@ -346,30 +628,10 @@ class TweetCog(commands.Cog):
         Returns:
             ツイートIDのリスト（リツイートを除く）
         """
-        async with async_playwright() as p:
-            try:
-                browser = await p.chromium.launch(
-                    headless=True,  # 新しいヘッドレスモードを自動使用
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-web-security',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-gpu'
-                    ]
-                )
-            except Exception as e:
-                print(f"ブラウザ起動エラー: {e}")
-                return []
-
-            try:
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
+        try:
+            async with self.browser_pool.lease(
+                viewport={'width': 1920, 'height': 1080}
+            ) as context:
                 page = await context.new_page()
 
                 # HTTPヘッダーを設定
@@ -380,30 +642,27 @@ class TweetCog(commands.Cog):
                     'Connection': 'keep-alive',
                 })
 
-                url = f"https://x.com/{username}"
+                url = f"{self.x_url}/{username}"
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 print(f"[{timestamp}] {url} にアクセス中...")
 
+                timer = StageTimer("Xプロフィール")
+
                 # タイムアウトを長めに設定し、待機条件を緩和
                 try:
                     await page.goto(url, wait_until='domcontentloaded', timeout=60000)
                 except PlaywrightTimeout:
                     print("ページ読み込みタイムアウト。部分的に読み込まれた内容で続行します...")
+                timer.mark("goto")
                 
-                # DOMが安定するまで待機
-                await page.wait_for_timeout(5000)
+                # タイムラインが描画されるまで待機
+                if not await self._wait_for_timeline(page):
+                    print("タイムラインの表示を待機中にタイムアウトしました")
+                timer.mark("timeline")
 
                 # ポップアップを閉じる
-                try:
-                    close_buttons = await page.query_selector_all('[aria-label="閉じる"], [aria-label="Close"]')
-                    for button in close_buttons:
-                        try:
-                            await button.click(timeout=1000)
-                            await page.wait_for_timeout(500)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+                await self._close_popups(page)
+                timer.mark("popup")
 
                 tweet_ids = []
                 seen_ids = set()
@@ -417,31 +676,18 @@ class TweetCog(commands.Cog):
                     print(f"ツイート取得試行 {attempt + 1}/{max_attempts}")
                     
                     # 方法1: ツイート記事から取得
-                    articles = await page.query_selector_all('article[data-testid="tweet"]')
-                    print(f"見つかった記事数: {len(articles)}")
+                    entries = await self._extract_tweets(page)
+                    print(f"見つかった記事数: {self._count_articles(entries)}")
 
-                    for article in articles:
+                    for tweet_id in self._filter_tweet_entries(entries, username):
                         if len(tweet_ids) >= count:
                             break
+                        if tweet_id not in seen_ids:
+                            tweet_ids.append(tweet_id)
+                            seen_ids.add(tweet_id)
+                            print(f"取得: {tweet_id}")
 
-                        try:
-                            if await self._is_retweet(article):
-                                continue
-
-                            status_link = await article.query_selector('a[href*="/status/"]')
-                            if status_link:
-                                href = await status_link.get_attribute('href')
-                                if href and f"/{username}/status/" in href:
-                                    match = re.search(r'/status/(\d+)', href)
-                                    if match:
-                                        tweet_id = match.group(1)
-                                        if tweet_id not in seen_ids:
-                                            tweet_ids.append(tweet_id)
-                                            seen_ids.add(tweet_id)
-                                            print(f"取得: {tweet_id}")
-                        except Exception as e:
-                            print(f"記事処理エラー: {e}")
-                            continue
+                    timer.mark("extract")
 
                     # 十分なツイートが取得できた場合は終了
                     if len(tweet_ids) >= count:
@@ -450,87 +696,153 @@ class TweetCog(commands.Cog):
                     # スクロールして再試行
                     if attempt < max_attempts - 1:
                         print("スクロールして追加読み込み中...")
-                        await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                        await page.wait_for_timeout(3000)
+                        await self._scroll_for_more(page)
+                        timer.mark("scroll")
 
                 # 方法2: すべてのステータスリンクから取得（フォールバック）
                 if len(tweet_ids) < count:
                     print("フォールバック: すべてのリンクから検索中...")
-                    all_links = await page.query_selector_all('a[href*="/status/"]')
-                    
-                    for link in all_links:
+                    entries = await self._extract_tweets(page)
+
+                    for tweet_id in self._filter_tweet_entries(entries, username, include_links=True):
                         if len(tweet_ids) >= count:
                             break
-                        
-                        try:
-                            href = await link.get_attribute('href')
-                            if href and f"/{username}/status/" in href:
-                                match = re.search(r'/status/(\d+)', href)
-                                if match:
-                                    tweet_id = match.group(1)
-                                    if tweet_id not in seen_ids:
-                                        tweet_ids.append(tweet_id)
-                                        seen_ids.add(tweet_id)
-                                        print(f"リンクから取得: {tweet_id}")
-                        except Exception:
-                            continue
+                        if tweet_id not in seen_ids:
+                            tweet_ids.append(tweet_id)
+                            seen_ids.add(tweet_id)
+                            print(f"リンクから取得: {tweet_id}")
 
+                timer.mark("fallback")
                 print(f"最終取得数: {len(tweet_ids)}")
+                print(timer.summary())
                 return tweet_ids[:count]
 
-            except Exception as e:
-                print(f"スクレイピングエラー: {e}")
-                return []
+        except Exception as e:
+            print(f"スクレイピングエラー: {e}")
+            return []
+
+    async def _wait_for_timeline(self, page, timeout_ms: int = 15000) -> bool:
+        """
+        ツイート記事の描画、またはタイムラインAPIの応答のどちらかを待ちます。
+
+        固定時間のスリープの代わりに使い、表示され次第すぐに抽出へ進みます。
+
+        Returns:
+            期限内にタイムラインが確認できた場合True
+        """
+        article_waiter = asyncio.create_task(
+            page.wait_for_selector(TWEET_SELECTOR, timeout=timeout_ms)
+        )
+        response_waiter = asyncio.create_task(
+            page.wait_for_response(
+                lambda response: TIMELINE_API_PATTERN.search(response.url) is not None,
+                timeout=timeout_ms,
+            )
+        )
+        pending = {article_waiter, response_waiter}
+        found = False
+        try:
+            while pending and not found:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                found = any(task.exception() is None for task in done)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # APIの応答が先に来た場合は、記事の描画まで短く待つ
+        article_rendered = (
+            article_waiter.done()
+            and not article_waiter.cancelled()
+            and article_waiter.exception() is None
+        )
+        if found and not article_rendered:
+            try:
+                await page.wait_for_selector(TWEET_SELECTOR, timeout=3000)
+            except PlaywrightTimeout:
+                pass
+        return found
+
+    async def _scroll_for_more(self, page, timeout_ms: int = 3000):
+        """
+        ページ末尾までスクロールし、末尾の記事が入れ替わるまで待ちます（最大 timeout_ms）。
+        """
+        last_href_script = """
+            (selector) => {
+                const articles = document.querySelectorAll(selector);
+                const last = articles[articles.length - 1];
+                const link = last && last.querySelector('a[href*="/status/"]');
+                return link ? link.getAttribute('href') : null;
+            }
+        """
+        try:
+            previous = await page.evaluate(last_href_script, TWEET_SELECTOR)
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            await page.wait_for_function(
+                f"([selector, previous]) => ({last_href_script})(selector) !== previous",
+                arg=[TWEET_SELECTOR, previous],
+                timeout=timeout_ms,
+            )
+        except PlaywrightTimeout:
+            print("スクロール後の追加読み込みはありませんでした")
+        except Exception as e:
+            print(f"スクロールエラー: {e}")
 
-            finally:
+    async def _close_popups(self, page):
+        """ログイン誘導などのポップアップを閉じます。"""
+        try:
+            close_buttons = await page.query_selector_all('[aria-label="閉じる"], [aria-label="Close"]')
+            for button in close_buttons:
                 try:
-                    await context.close()
+                    await button.click(timeout=1000)
                 except Exception:
                     pass
-                await browser.close()
+        except Exception:
+            pass
 
-    async def _is_retweet(self, article_element) -> bool:
+    async def _extract_tweets(self, page) -> list:
         """
-        ツイート要素がリツイートかどうかを判定します。
-
-        Args:
-            article_element: Playwright要素（ツイート記事）
+        表示中の全ツイートを1回の page.evaluate で構造化して取得します。
 
         Returns:
-            リツイートの場合True、オリジナルツイートの場合False
+            {id, author, is_retweet, is_reply, source} の辞書リスト。
+            source は記事由来なら "article"、記事外も含む全リンク由来なら "link"。
         """
         try:
-            # 方法1: リツイートを示すテキストを探す
-            retweet_indicators = [
-                '[data-testid="socialContext"]',
-                'span:has-text("がリツイートしました")',
-                'span:has-text("retweeted")',
-                'span:has-text("Retweeted")',
-            ]
-
-            for indicator in retweet_indicators:
-                try:
-                    element = await article_element.query_selector(indicator)
-                    if element:
-                        return True
-                except Exception:
-                    continue
+            return await page.evaluate(EXTRACT_TWEETS_SCRIPT, TWEET_SELECTOR)
+        except Exception as e:
+            print(f"ツイート抽出エラー: {e}")
+            return []
 
-            # 方法2: ツイートリンクが対象ユーザーのものかチェック
-            try:
-                status_link = await article_element.query_selector('a[href*="/status/"]')
-                if status_link:
-                    href = await status_link.get_attribute('href')
-                    if href and f"/{self.x_user}/status/" not in href:
-                        return True
-            except Exception:
-                pass
+    @staticmethod
+    def _count_articles(entries: list) -> int:
+        return sum(1 for entry in entries if entry.get("source") == "article")
 
-            return False
+    @staticmethod
+    def _filter_tweet_entries(entries: list, username: str, include_links: bool = False) -> list:
+        """
+        抽出結果から本人のオリジナル投稿だけを表示順・重複なしで返します。
 
-        except Exception as e:
-            print(f"リツイート判定エラー: {e}")
-            return False
+        Args:
+            entries: _extract_tweets() の結果
+            username: Xのユーザー名
+            include_links: 記事として判定できなかったリンクも候補に含める場合True
+        """
+        tweet_ids = []
+        seen_ids = set()
+        username = username.lower()
+        for entry in entries:
+            if entry.get("source") == "link" and not include_links:
+                continue
+            if (entry.get("author") or "").lower() != username:
+                continue
+            if entry.get("is_retweet") or entry.get("is_reply"):
+                continue
+            tweet_id = entry.get("id")
+            if tweet_id and tweet_id not in seen_ids:
+                tweet_ids.append(tweet_id)
+                seen_ids.add(tweet_id)
+        return tweet_ids
 
     async def get_tweet_ids_vxtwitter(self, username: str, count: int = 2) -> list:
         """
@@ -544,39 +856,37 @@ class TweetCog(commands.Cog):
         Returns:
             ツイートIDのリスト
         """
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-
-            try:
-                page = await browser.new_page()
-                url = f"https://vxtwitter.com/{username}"
+        try:
+            async with self.browser_pool.lease() as context:
+                page = await context.new_page()
+                url = f"{self.vxtwitter_url}/{username}"
                 print(f"vxTwitterを試行中: {url}")
 
                 try:
+                    timer = StageTimer("vxTwitter")
                     await page.goto(url, timeout=20000, wait_until='domcontentloaded')
-                    await page.wait_for_timeout(2000)
+                    timer.mark("goto")
+                    try:
+                        await page.wait_for_selector('a[href*="/status/"]', timeout=5000)
+                    except PlaywrightTimeout:
+                        pass
+                    timer.mark("wait")
 
                     tweet_ids = []
                     seen_ids = set()
 
                     # ツイートリンクを探す
-                    links = await page.query_selector_all('a[href*="/status/"]')
+                    entries = await self._extract_tweets(page)
 
-                    for link in links:
+                    for tweet_id in self._filter_tweet_entries(entries, username, include_links=True):
                         if len(tweet_ids) >= count:
                             break
+                        if tweet_id not in seen_ids:
+                            tweet_ids.append(tweet_id)
+                            seen_ids.add(tweet_id)
 
-                        try:
-                            href = await link.get_attribute('href')
-                            if href and f"/{username}/status/" in href:
-                                match = re.search(r'/status/(\d+)', href)
-                                if match:
-                                    tweet_id = match.group(1)
-                                    if tweet_id not in seen_ids:
-                                        tweet_ids.append(tweet_id)
-                                        seen_ids.add(tweet_id)
-                        except Exception:
-                            continue
+                    timer.mark("extract")
+                    print(timer.summary())
 
                     if tweet_ids:
                         print(f"vxTwitterから{len(tweet_ids)}件取得しました")
@@ -586,49 +896,103 @@ class TweetCog(commands.Cog):
                     print(f"vxTwitterエラー: {e}")
                     return []
 
-            finally:
-                await browser.close()
+        except Exception as e:
+            print(f"vxTwitterブラウザエラー: {e}")
 
         return []
 
-    def load_sent_tweets(self) -> list:
-        """
-        送信済みツイートIDをJSONファイルから読み込みます。
+    def _update_timeline(self, account: str, tweet_ids: list):
+        """取得結果をアカウントのタイムラインキャッシュにマージします。"""
+        entry = self.timelines.get(account)
+        previous = entry["ids"] if entry else []
+        self.timelines[account] = {
+            "ids": self._unique_latest_tweet_ids(tweet_ids + previous, TIMELINE_CACHE_SIZE),
+            "fetched_at": time.monotonic(),
+        }
 
-        Returns:
-            送信済みツイートIDのリスト
-        """
+    async def _refresh_timeline(self, account: str, count: int) -> list:
         try:
-            with open(self.data_file_tweets, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def save_sent_tweets(self, tweets_id: list):
+            tweet_ids = await self.get_latest_tweet_ids(account, count)
+            if tweet_ids:
+                self._update_timeline(account, tweet_ids)
+        finally:
+            refresh = self._timeline_refreshes.get(account)
+            if refresh is not None and refresh[0] is asyncio.current_task():
+                del self._timeline_refreshes[account]
+        # 取得に失敗した場合は古いキャッシュでも返す
+        entry = self.timelines.get(account)
+        return entry["ids"] if entry else []
+
+    def _fresh_timeline(self, account: str, count: int) -> list | None:
+        """キャッシュが新しく件数も足りていればそのIDを、そうでなければ None を返します。"""
+        entry = self.timelines.get(account)
+        if (
+            entry
+            and time.monotonic() - entry["fetched_at"] <= self.timeline_max_age
+            and len(entry["ids"]) >= count
+        ):
+            return entry["ids"][:count]
+        return None
+
+    async def get_cached_timeline(self, account: str, count: int) -> list:
         """
-        ツイートIDをJSONファイルに保存します。
+        キャッシュ済みタイムラインから最新ツイートIDを返します。
 
-        Args:
-            tweets_id: 保存するツイートIDのリスト
+        キャッシュが timeline_max_age 秒より古いか件数が足りない場合だけ取得し、
+        同じアカウントへの同時リクエストは1回の取得を共有します。
+        実行中の取得の件数が足りない場合は、その完了を待ってから取り直します
+        （同じアカウントの取得は同時に1つまで）。
         """
-        with open(self.data_file_tweets, "w", encoding="utf-8") as f:
-            json.dump(tweets_id, f, indent=4, ensure_ascii=False)
+        cached = self._fresh_timeline(account, count)
+        if cached is not None:
+            return cached
+
+        # 呼び出し元がキャンセルされても、共有している取得は止めない
+        while (refresh := self._timeline_refreshes.get(account)) is not None:
+            if refresh[1] >= count:
+                return (await asyncio.shield(refresh[0]))[:count]
+            await asyncio.shield(refresh[0])
+            cached = self._fresh_timeline(account, count)
+            if cached is not None:
+                return cached
+
+        fetch_count = max(count, 10)
+        task = asyncio.create_task(self._refresh_timeline(account, fetch_count))
+        self._timeline_refreshes[account] = (task, fetch_count)
+        return (await asyncio.shield(task))[:count]
 
     @commands.command(name="X")
-    async def last_tweets(self, ctx: commands.Context, count: int = 1):
+    async def last_tweets(self, ctx: commands.Context, count: int = 1, account: str | None = None):
         """
-        FF_XIV_JPの最新ツイートを表示します。
+        FF_XIV_JP（または指定アカウント）の最新ツイートを表示します。
         
-        使い方: !X [件数]
+        使い方: !X [件数] [アカウント]
         例: !X 3
+            !X 3 FF_XIV_EN
+
+        表示できるのは購読中のアカウント（と既定のアカウント）だけで、
+        件数はタイムラインキャッシュの件数までです。
         """
+        requested = (account or self.x_user).lstrip("@")
+        account = self.subscriptions.resolve(requested)
+        if account is None and requested.lower() == self.x_user.lower():
+            account = self.x_user
+        if account is None:
+            followed = ", ".join(f"@{name}" for name in self.subscriptions.accounts()) or "なし"
+            await ctx.reply(
+                f"⚠️ @{requested} は購読していないため表示できません。\n購読中のアカウント: {followed}",
+                mention_author=False
+            )
+            return
+        count = min(max(count, 1), TIMELINE_CACHE_SIZE)
+
         async with ctx.typing():
-            tweet_ids = await self.get_latest_tweet_ids(self.x_user, count)
+            tweet_ids = await self.get_cached_timeline(account, count)
 
             if tweet_ids:
                 messages = []
                 for i, tweet_id in enumerate(tweet_ids, 1):
-                    link = f"https://x.com/{self.x_user}/status/{tweet_id}"
+                    link = f"https://x.com/{account}/status/{tweet_id}"
                     messages.append(f"ツイート {i}: {link}")
                 await ctx.reply("\n".join(messages))
             else:
@@ -638,63 +1002,290 @@ class TweetCog(commands.Cog):
                     "しばらく待ってから再度お試しください。"
                 )
 
+    @commands.command(name="x_follow")
+    @commands.has_permissions(administrator=True)
+    async def x_follow(
+        self, ctx: commands.Context, account: str, channel: discord.TextChannel | None = None
+    ):
+        """
+        Xアカウントの新規投稿をチャンネルに通知します（管理者のみ）
+
+        使い方: !x_follow <アカウント> [#チャンネル]
+        例: !x_follow FF_XIV_EN #news
+        """
+        account = account.lstrip("@")
+        channel = channel or ctx.channel
+        if self.subscriptions.add(account, channel.id):
+            await ctx.reply(f"✅ @{account} の新規投稿を {channel.mention} に通知します。", mention_author=False)
+        else:
+            await ctx.reply(f"⚠️ @{account} は既に {channel.mention} で購読しています。", mention_author=False)
+
+    @commands.command(name="x_unfollow")
+    @commands.has_permissions(administrator=True)
+    async def x_unfollow(
+        self, ctx: commands.Context, account: str, channel: discord.TextChannel | None = None
+    ):
+        """
+        Xアカウントの通知を解除します（管理者のみ）
+
+        使い方: !x_unfollow <アカウント> [#チャンネル]
+        """
+        account = account.lstrip("@")
+        channel = channel or ctx.channel
+        if self.subscriptions.remove(account, channel.id):
+            await ctx.reply(f"✅ {channel.mention} での @{account} の通知を解除しました。", mention_author=False)
+        else:
+            await ctx.reply(f"⚠️ {channel.mention} は @{account} を購読していません。", mention_author=False)
+
+    @x_follow.error
+    @x_unfollow.error
+    async def x_subscription_error(self, ctx: commands.Context, error):
+        """購読コマンドのエラーハンドリング"""
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.reply("❌ このコマンドは管理者のみ実行できます。", mention_author=False)
+        elif isinstance(error, commands.ChannelNotFound):
+            await ctx.reply(f"❌ チャンネルが見つかりません: {error.argument}", mention_author=False)
+
+    @commands.command(name="x_subs")
+    async def x_subs(self, ctx: commands.Context):
+        """
+        このサーバーのX通知の購読一覧を表示します
+
+        使い方: !x_subs
+        """
+        guild_channel_ids = {channel.id for channel in ctx.guild.channels} if ctx.guild else {ctx.channel.id}
+        lines = []
+        for account, channel_ids in sorted(self.subscriptions.items()):
+            mentions = [f"<#{channel_id}>" for channel_id in sorted(channel_ids) if channel_id in guild_channel_ids]
+            if mentions:
+                lines.append(f"**@{account}** → {', '.join(mentions)}")
+
+        embed = discord.Embed(
+            title="🐦 X通知の購読一覧",
+            description="\n".join(lines) or "購読はありません。`!x_follow <アカウント>` で追加できます。",
+            color=discord.Color.blue()
+        )
+        await ctx.reply(embed=embed, mention_author=False)
+
+    @commands.command(name="x_sources", hidden=True)
+    @commands.is_owner()
+    async def x_sources(self, ctx: commands.Context):
+        """
+        📡 ツイート取得元の健全性スコアを表示（Bot所有者のみ）
+
+        使い方: !x_sources
+        """
+        sources = {source["key"]: source for source in self._tweet_sources()}
+        order = self.source_health.rank(list(sources.values()))
+        ranked = [source["key"] for source in order]
+
+        embed = discord.Embed(
+            title="📡 ツイート取得元の状態",
+            description="スコア順（高いほど優先）",
+            color=discord.Color.blue()
+        )
+        for key in ranked + [key for key in sources if key not in ranked]:
+            health = self.source_health.get(key)
+            if self.source_health.is_suspended(key):
+                status = f"⏸️ スキップ中（{self.source_health.next_probe_in(key) / 60:.0f}分後に再確認）"
+            else:
+                status = "✅ 有効"
+            embed.add_field(
+                name=f"{sources[key]['name']} ({key})",
+                value=(
+                    f"{status}\n"
+                    f"スコア: **{health.score:.2f}**\n"
+                    f"成功率: {health.success_rate:.0%} / 鮮度: {health.freshness:.0%}\n"
+                    f"応答: {health.latency:.1f}秒 / 連続失敗: {health.consecutive_failures}回\n"
+                    f"試行: {health.attempts}回"
+                ),
+                inline=False
+            )
+        await ctx.reply(embed=embed, mention_author=False)
+
+    @commands.command(name="x_deliveries", hidden=True)
+    @commands.is_owner()
+    async def x_deliveries(self, ctx: commands.Context):
+        """
+        📬 チャンネルごとの通知の配信状態を表示（Bot所有者のみ）
+
+        使い方: !x_deliveries
+        """
+        states = sorted(
+            self.notifier.items(),
+            key=lambda item: (-item[1].consecutive_failures, item[0]),
+        )
+        embed = discord.Embed(
+            title="📬 通知の配信状態",
+            description="連続失敗の多い順" if states else "まだ配信記録はありません。",
+            color=discord.Color.blue()
+        )
+        for channel_id, state in states[:25]:
+            status = "✅" if state.consecutive_failures == 0 else f"⚠️ 連続失敗 {state.consecutive_failures}回"
+            value = (
+                f"<#{channel_id}> {status}\n"
+                f"成功: {state.delivered}件 / 失敗: {state.failed}件 / 再試行: {state.retries}回"
+            )
+            if state.last_success:
+                value += f"\n最終成功: <t:{int(state.last_success)}:R>"
+            if state.consecutive_failures and state.last_error:
+                value += f"\nエラー: {state.last_error[:200]}"
+            embed.add_field(name=f"チャンネル {channel_id}", value=value, inline=False)
+        await ctx.reply(embed=embed, mention_author=False)
+
     @tasks.loop(minutes=2)
     async def fetch_tweets_task(self):
         """
-        設定された間隔で最新ツイートをチェックし、新規ツイートがあればDiscordに通知します。
+        設定された間隔で購読中の全アカウントをチェックし、新規ツイートがあれば
+        購読しているチャンネルへ通知します。
+
+        アカウントは購読チャンネル数に関係なく1回ずつ、順番に取得します
+        （ブラウザを使う取得が同時に走る数を増やさないため）。
         """
-        channel = self.bot.get_channel(self.channel_id)
-        if not channel:
-            print(f"エラー: チャンネルID {self.channel_id} が見つかりません")
-            return
+        found_new = False
+        for account in self.subscriptions.accounts():
+            try:
+                found_new = bool(await self.check_account(account)) or found_new
+            except Exception as e:
+                print(f"@{account} のチェック中にエラー: {e}")
 
-        self.sent_tweets = self.load_sent_tweets()
+        interval, reason = self.schedule.next_interval(found_new)
+        self.fetch_tweets_task.change_interval(minutes=interval)
+        print(f"TweetCog: 次回チェックまで {interval:g}分 ({reason})")
 
-        tweet_ids = await self.get_latest_tweet_ids(self.x_user, 10)
+    async def check_account(self, account: str) -> int:
+        """
+        1アカウント分の新規ツイートを検出し、購読チャンネルへ通知します。
+
+        Args:
+            account: Xのユーザー名
+
+        Returns:
+            通知した新規ツイートの件数
+        """
+        channels = []
+        for channel_id in sorted(self.subscriptions.channels(account)):
+            channel = self.bot.get_channel(channel_id)
+            if channel:
+                channels.append(channel)
+            else:
+                print(f"エラー: チャンネルID {channel_id} が見つかりません (@{account})")
+        if not channels:
+            return 0
+
+        seen = self.tweet_state.get(account)
+        last_sent_tweet_id = seen.max_id
+        try:
+            tweet_ids = await self.get_latest_tweet_ids(
+                account, 10, known_latest_id=last_sent_tweet_id
+            )
+        except FeedNotModified as e:
+            print(f"@{account}: Nitter RSSに更新がないため、今回のチェックを省略します")
+            self._update_timeline(account, e.tweet_ids)
+            return await self._deliver(account, channels, [])
         
         if not tweet_ids:
-            print("ツイートIDの取得に失敗しました。次回の実行を待ちます。")
-            return
+            print(f"@{account}: ツイートIDの取得に失敗しました。次回の実行を待ちます。")
+            return await self._deliver(account, channels, [])
+
+        self._update_timeline(account, tweet_ids)
+        self.schedule.observe(tweet_ids)
 
         # 初回実行時
-        if not self.sent_tweets:
-            self.save_sent_tweets([tweet_ids[0]])
-            print("初回実行: 最新ツイートIDを保存しました")
-            return
+        if not seen:
+            seen.add(tweet_ids[0])
+            self.tweet_state.mark_dirty()
+            print(f"@{account}: 初回実行: 最新ツイートIDを保存しました")
+            return 0
+
+        # 新規ツイートを検出（複数ある場合は投稿順になるよう古いものから通知）
+        new_tweets = sorted(
+            (
+                tweet_id for tweet_id in tweet_ids
+                if tweet_id not in seen and int(tweet_id) > int(last_sent_tweet_id)
+            ),
+            key=lambda x: int(x),
+        )
 
-        last_sent_tweet_id = max(self.sent_tweets, key=lambda x: int(x))
+        if not new_tweets:
+            print(f"@{account}: 新規ツイートはありません")
+            return await self._deliver(account, channels, [])
 
-        # 新規ツイートを検出
-        new_tweets = []
-        for tweet_id in tweet_ids:
-            if tweet_id not in self.sent_tweets and int(tweet_id) > int(last_sent_tweet_id):
-                new_tweets.append(tweet_id)
+        # 送信前に通知済みとして確実に保存し、クラッシュ時の二重通知を防ぐ
+        for tweet_id in new_tweets:
+            seen.add(tweet_id)
+        try:
+            await self.tweet_state.flush()
+        except OSError:
+            # 保存できなかったIDを通知済みのまま残すと、次回も検出されず通知されなくなる
+            for tweet_id in new_tweets:
+                seen.discard(tweet_id)
+            raise
+
+        return await self._deliver(account, channels, new_tweets)
+
+    def _tweet_message(self, account: str, tweet_id: str) -> dict:
+        """通知メッセージ（channel.send() の引数）を作ります。"""
+        link = f"https://x.com/{account}/status/{tweet_id}"
+        details = self.tweet_api.get_cached(tweet_id)
+        if details:
+            # 取得時のメタデータで埋め込みを作る（リンクの自動展開は抑止）
+            return {
+                "content": f"🐦 新しいツイートがあります！\n<{link}>",
+                "embed": build_tweet_embed(details),
+            }
+        return {"content": f"🐦 新しいツイートがあります！\n{link}"}
+
+    async def _deliver(self, account: str, channels: list, new_tweets: List[str]) -> int:
+        """
+        新規ツイートと、前回届かなかったツイートを購読チャンネルへ送ります。
 
-        if not new_tweets:
-            print("新規ツイートはありません")
-            return
+        全ツイートを先にチャンネルごとの送信キューへ積むため、同じチャンネルには
+        投稿順に、別のチャンネルへは互いの再試行を待たずに並行して送られます。
+        届かなかった（チャンネル, ツイート）は次回のチェックで同じ順番で再送し、
+        redelivery_attempts 回続けて届かなければ諦めます。
 
-        # 複数の新規投稿がある場合は、投稿順になるよう古いものから通知
-        sent_now = []
-        for tweet_id in sorted(new_tweets, key=lambda x: int(x)):
-            try:
-                await channel.send(
-                    f"🐦 新しいツイートがあります！\n"
-                    f"https://x.com/{self.x_user}/status/{tweet_id}"
+        Args:
+            account: Xのユーザー名
+            channels: 送信先のチャンネル
+            new_tweets: 今回検出した新規ツイートID（古い順）
+
+        Returns:
+            1チャンネル以上に届いた新規ツイートの件数
+        """
+        # 購読をやめたチャンネルの再送分は破棄する
+        pending = self._undelivered.pop(account, {})
+        submitted = []
+        for channel in channels:
+            queue = pending.get(channel.id, []) + [(tweet_id, 0) for tweet_id in new_tweets]
+            for tweet_id, failures in queue:
+                future = self.notifier.submit(channel, key=tweet_id, **self._tweet_message(account, tweet_id))
+                submitted.append((channel.id, tweet_id, failures, future))
+        if not submitted:
+            return 0
+
+        results = await asyncio.gather(*(future for *_, future in submitted), return_exceptions=True)
+        delivered: Dict[str, int] = {}
+        for (channel_id, tweet_id, failures, _), result in zip(submitted, results):
+            if result is True:
+                delivered[tweet_id] = delivered.get(tweet_id, 0) + 1
+            elif failures + 1 < self.redelivery_attempts:
+                self._undelivered.setdefault(account, {}).setdefault(channel_id, []).append(
+                    (tweet_id, failures + 1)
                 )
-                sent_now.append(tweet_id)
-                print(f"新規ツイートを通知しました: {tweet_id}")
-            except Exception as e:
-                print(f"通知送信エラー: {e}")
-                break
+            else:
+                print(
+                    f"@{account}: ツイート {tweet_id} をチャンネル {channel_id} へ"
+                    f"{failures + 1}回送信できなかったため、再送を諦めます"
+                )
+        self.notifier.mark_dirty()
 
-        if sent_now:
-            updated_sent_tweets = sorted(
-                set(sent_now + self.sent_tweets),
-                key=lambda x: int(x),
-                reverse=True,
-            )[:10]
-            self.save_sent_tweets(updated_sent_tweets)
+        for tweet_id in new_tweets:
+            print(f"@{account}: 新規ツイートを通知しました: {tweet_id} ({delivered.get(tweet_id, 0)}/{len(channels)}チャンネル)")
+        waiting = sum(len(queue) for queue in self._undelivered.get(account, {}).values())
+        if waiting:
+            print(f"@{account}: 届かなかった通知{waiting}件を次回のチェックで再送します")
+        return sum(1 for tweet_id in new_tweets if delivered.get(tweet_id))
 
     @fetch_tweets_task.before_loop
     async def before_fetch_tweets(self):
@@ -702,7 +1293,7 @@ class TweetCog(commands.Cog):
         await self.bot.wait_until_ready()
         print(
             f"TweetCog: 定期タスクを開始しました "
-            f"({self.check_interval_minutes:g}分間隔)"
+            f"({self.schedule.min_minutes:g}〜{self.schedule.max_minutes:g}分間隔)"
         )
 
     @fetch_tweets_task.error
@@ -711,9 +1302,14 @@ class TweetCog(commands.Cog):
         print(f"定期タスクエラー: {error}")
         # エラーが発生しても次回の実行は継続
 
-    def cog_unload(self):
-        """Cogアンロード時に定期タスクをキャンセルします。"""
+    async def cog_unload(self):
+        """Cogアンロード時に定期タスクをキャンセルし、常駐ブラウザを終了します。"""
         self.fetch_tweets_task.cancel()
+        await self.browser_pool.close()
+        await self.feed_client.close()
+        await self.notifier.close()
+        await self.source_health.close()
+        await self.tweet_state.close()
         print("TweetCog: 定期タスクを停止しました")
 
 
@@ -0,0 +1,278 @@
+# tools/freetalk_load.py
+"""
+FreeTalkCog の負荷試験。
+
+Gemini の代わりに API を呼ばない FakeBackend を使い、N 人の仮想ユーザーが
+同時に _send_ai_message を呼び続ける。応答時間（最初の文字まで・完了まで）の
+p50/p99、event loop の遅延、その間に実行した別コマンド（!hello）の応答時間を表示する。
+
+使い方:
+    python tools/freetalk_load.py                          # 20人 × 5回
+    python tools/freetalk_load.py --users 100 --messages 3 --latency 2
+    python tools/freetalk_load.py --failure-rate 0.1 --concurrency 8
+    python tools/freetalk_load.py --json after.json        # 結果をJSONで保存して比較
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from cogs import freetalk_cog  # noqa: E402
+from cogs.general_cog import GeneralCog  # noqa: E402
+from cogs._chat_backend import FakeBackend  # noqa: E402
+from cogs._fair_scheduler import FairScheduler  # noqa: E402
+
+# 応答の最後の状態から結果を分類する
+OUTCOMES = (
+    ("busy", "🚦"),
+    ("timeout", "⌛"),
+    ("error", "❌"),
+    ("cancelled", "⚠️"),
+)
+
+
+# ---------------------------------------------------------------------- discord stubs
+
+class LoadMessage:
+    """編集内容と時刻を記録するだけのメッセージ。"""
+
+    def __init__(self, content: str, latency: float):
+        self.content = content
+        self.latency = latency
+        self.first_text_at = None
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.content = content
+        if self.first_text_at is None:
+            self.first_text_at = time.perf_counter()
+
+
+class LoadObject:
+    def __init__(self, object_id: int):
+        self.id = object_id
+
+
+class LoadContext:
+    """ctx.reply / ctx.send を記録するコンテキスト。"""
+
+    def __init__(self, user_id: int, channel_id: int, latency: float):
+        self.author = LoadObject(user_id)
+        self.channel = LoadObject(channel_id)
+        self.latency = latency
+        self.messages: list[LoadMessage] = []
+
+    async def reply(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        message = LoadMessage(content, self.latency)
+        self.messages.append(message)
+        return message
+
+    async def send(self, content=None, **kwargs):
+        return await self.reply(content, **kwargs)
+
+    def outcome(self) -> str:
+        if not self.messages:
+            return "superseded"
+        content = self.messages[-1].content or ""
+        for name, marker in OUTCOMES:
+            if content.startswith(marker) or f"\n\n{marker}" in content:
+                return name
+        return "ok"
+
+
+class LoadBot:
+    latency = 0.0
+    cogs: dict = {}
+
+    def get_cog(self, name: str):
+        return None
+
+
+# ---------------------------------------------------------------------- measurement
+
+def _pad(text: str, width: int) -> str:
+    """全角文字を2桁として width 桁にそろえる。"""
+    return text + " " * (width - sum(2 if ord(char) > 127 else 1 for char in text))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def monitor_loop_lag(interval: float, samples: list[float], stop: asyncio.Event):
+    """interval 秒ごとに起き、予定時刻からの遅れを記録する。"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def probe_other_command(general: GeneralCog, interval: float, samples: list[float], stop: asyncio.Event):
+    """チャットの負荷中に、AIを使わないコマンド（!hello）の応答時間を計測する。"""
+    while not stop.is_set():
+        ctx = LoadContext(0, 0, 0.0)
+        started = time.perf_counter()
+        await general.hello.callback(general, ctx)
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def simulate_user(cog, args, user_id: int, rng: random.Random, results: list[dict]):
+    channel_id = user_id % args.channels + 1
+    for turn in range(args.messages):
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+        ctx = LoadContext(user_id, channel_id, args.send_latency)
+        started = time.perf_counter()
+        await cog._send_ai_message(ctx, args.mode, f"ユーザー{user_id}の質問{turn}")
+        finished = time.perf_counter()
+
+        first = next((m.first_text_at for m in ctx.messages if m.first_text_at), None)
+        results.append({
+            "user": user_id,
+            "outcome": ctx.outcome(),
+            "latency": finished - started,
+            "first_text": (first - started) if first else None,
+        })
+
+
+async def run(args) -> dict:
+    backend = FakeBackend(
+        latency=args.latency,
+        chunks=args.chunks,
+        chunk_rate=args.chunk_rate,
+        failure_rate=args.failure_rate,
+        reply_chars=args.reply_chars,
+        seed=args.seed,
+    )
+    with contextlib.redirect_stdout(io.StringIO() if args.quiet else sys.stdout):
+        cog = freetalk_cog.FreeTalkCog(LoadBot(), backend=backend)
+    cog.scheduler = FairScheduler(
+        max_concurrency=args.concurrency,
+        max_queue_per_user=args.user_queue,
+        max_queue=args.max_queue,
+        group_limits={mode: args.mode_concurrency for mode in freetalk_cog.PERSONALITIES},
+    )
+    cog.response_timeout = args.timeout
+    general = GeneralCog(LoadBot())
+
+    rng = random.Random(args.seed)
+    results: list[dict] = []
+    lag: list[float] = []
+    other: list[float] = []
+    stop = asyncio.Event()
+    background = [
+        asyncio.create_task(monitor_loop_lag(0.05, lag, stop)),
+        asyncio.create_task(probe_other_command(general, 0.2, other, stop)),
+    ]
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO() if args.quiet else sys.stdout):
+        await asyncio.gather(*(
+            simulate_user(cog, args, user_id, random.Random(rng.random()), results)
+            for user_id in range(1, args.users + 1)
+        ))
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+        stop.set()
+        await asyncio.gather(*background)
+        await cog.cog_unload()
+
+    outcomes: dict[str, int] = {}
+    for row in results:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    ok = [row for row in results if row["outcome"] == "ok"]
+    return {
+        "users": args.users,
+        "messages": len(results),
+        "wall": wall,
+        "cpu": cpu,
+        "outcomes": outcomes,
+        "latency": [row["latency"] for row in ok],
+        "first_text": [row["first_text"] for row in ok if row["first_text"] is not None],
+        "loop_lag": lag,
+        "other_command": other,
+        "backend_requests": backend.requests,
+        "scheduler": {
+            "granted": cog.scheduler.granted,
+            "rejected": cog.scheduler.rejected,
+            "superseded": cog.scheduler.superseded,
+        },
+    }
+
+
+def print_report(result: dict, args):
+    print(
+        f"ユーザー {args.users}人 × {args.messages}回 / チャンネル {args.channels} / "
+        f"同時実行 {args.concurrency} (性格ごと {args.mode_concurrency}) / "
+        f"遅延 {args.latency:g}s, {args.chunks}分割 {args.chunk_rate:g}個/s, 失敗率 {args.failure_rate:.0%}"
+    )
+    print("-" * 72)
+    outcomes = ", ".join(f"{name}={count}" for name, count in sorted(result["outcomes"].items()))
+    print(f"メッセージ {result['messages']}件 ({outcomes}) / API呼び出し {result['backend_requests']}回")
+    print(f"{'':16} {'p50':>9} {'p99':>9} {'max':>9}")
+    for label, key in (
+        ("応答完了", "latency"),
+        ("最初の文字", "first_text"),
+        ("event loop 遅延", "loop_lag"),
+        ("別コマンド応答", "other_command"),
+    ):
+        values = result[key]
+        print(
+            f"{_pad(label, 16)} {percentile(values, 50) * 1000:>7.1f}ms {percentile(values, 99) * 1000:>7.1f}ms "
+            f"{(max(values) if values else 0) * 1000:>7.1f}ms"
+        )
+    print("-" * 72)
+    print(
+        f"実時間 {result['wall']:.2f}s / CPU {result['cpu']:.2f}s / "
+        f"スループット {result['messages'] / result['wall']:.1f}件/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FreeTalkCog の負荷試験（FakeBackend 使用）")
+    parser.add_argument("--users", type=int, default=20, help="同時に会話する仮想ユーザー数")
+    parser.add_argument("--messages", type=int, default=5, help="1ユーザーあたりの発言数")
+    parser.add_argument("--channels", type=int, default=5, help="発言先のチャンネル数")
+    parser.add_argument("--mode", choices=list(freetalk_cog.PERSONALITIES), default="yankee",
+                        help="使う性格（normal は回答キャッシュの対象）")
+    parser.add_argument("--think-time", type=float, default=1.0, help="発言の間隔の最大秒数")
+    parser.add_argument("--latency", type=float, default=1.0, help="最初のチャンクまでの秒数")
+    parser.add_argument("--chunks", type=int, default=10, help="1応答の分割数")
+    parser.add_argument("--chunk-rate", type=float, default=20, help="1秒あたりのチャンク数")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="API呼び出しが失敗する割合")
+    parser.add_argument("--reply-chars", type=int, default=300, help="1応答の文字数")
+    parser.add_argument("--send-latency", type=float, default=0.05, help="Discord への送信・編集1回の秒数")
+    parser.add_argument("--concurrency", type=int, default=4, help="FREETALK_MAX_CONCURRENCY")
+    parser.add_argument("--mode-concurrency", type=int, default=2, help="FREETALK_MODE_CONCURRENCY")
+    parser.add_argument("--user-queue", type=int, default=3, help="FREETALK_USER_QUEUE")
+    parser.add_argument("--max-queue", type=int, default=50, help="FREETALK_MAX_QUEUE")
+    parser.add_argument("--timeout", type=float, default=60, help="FREETALK_TIMEOUT_SECONDS")
+    parser.add_argument("--seed", type=int, default=1, help="乱数シード")
+    parser.add_argument("--json", help="結果を保存するJSONファイル")
+    parser.add_argument("-v", "--verbose", dest="quiet", action="store_false",
+                        help="FreeTalkCog のログを表示する")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result, args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# tools/tweet_replay.py
+"""
+TweetCog のオフライン再生ベンチマーク。
+
+記録済みの RSS・Nitter HTML・x.com の DOM スナップショットをローカルHTTPサーバーで
+配信し、全取得元（Playwright 系を含む）をそこへ向けて TweetCog を実行する。
+1チェックごとに実時間・CPU時間・ピークRSS・ブラウザ起動回数を表示する。
+
+使い方:
+    python tools/tweet_replay.py run                       # fetch_tweets_task を再生
+    python tools/tweet_replay.py run --mode latest         # get_latest_tweet_ids のみ
+    python tools/tweet_replay.py run --sources nitter_rss,search --channels 100
+    python tools/tweet_replay.py run --json before.json    # 結果をJSONで保存して比較
+    python tools/tweet_replay.py record FF_XIV_JP tools/fixtures/tweet_replay/live/s1
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from cogs import tweet_cog  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "tweet_replay"
+CONTENT_TYPES = {
+    ".xml": "application/rss+xml; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+
+# ---------------------------------------------------------------------- fixture server
+
+class FixtureServer:
+    """
+    シナリオのスナップショットを配信するローカルHTTPサーバー（別スレッド）。
+
+    パスの先頭で取得元を区別する:
+        /nitter/<user>/rss  → nitter_rss.xml
+        /nitter/<user>      → nitter_page.html
+        /x/search           → x_search.html
+        /x/<user>           → x_profile.html
+        /vx/<user>          → vxtwitter.html
+        /syndication/...    → syndication.html
+    ETag を返し、If-None-Match が一致すれば 304 を返す。
+    """
+
+    def __init__(self, scenario_dir: Path):
+        self.scenario_dir = scenario_dir
+        self.snapshot = None
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def use_snapshot(self, name: str):
+        with self._lock:
+            self.snapshot = name
+            self.requests = {}
+
+    @staticmethod
+    def fixture_name(path: str) -> str | None:
+        parts = [part for part in urlsplit(path).path.split("/") if part]
+        if not parts:
+            return None
+        prefix, rest = parts[0], parts[1:]
+        if prefix == "nitter" and rest:
+            return "nitter_rss.xml" if rest[-1] == "rss" else "nitter_page.html"
+        if prefix == "x" and rest:
+            return "x_search.html" if rest[0] == "search" else "x_profile.html"
+        if prefix == "vx" and rest:
+            return "vxtwitter.html"
+        if prefix == "syndication":
+            return "syndication.html"
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = server.fixture_name(self.path)
+                with server._lock:
+                    snapshot = server.snapshot
+                    if name:
+                        server.requests[name] = server.requests.get(name, 0) + 1
+                path = server.scenario_dir / snapshot / name if name and snapshot else None
+                if path is None or not path.exists():
+                    self.send_error(404)
+                    return
+
+                body = path.read_bytes()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPES.get(path.suffix, "text/plain"))
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ---------------------------------------------------------------------- measurement
+
+def _process_tree_stats() -> tuple[int, int, float]:
+    """(自プロセスRSS, 子孫プロセスRSS合計, 子孫プロセスCPU秒) を /proc から求める。"""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    ticks = os.sysconf("SC_CLK_TCK")
+    parents, rss_pages, cpu_ticks = {}, {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            pid = int(entry)
+            parents[pid] = int(fields[1])
+            cpu_ticks[pid] = int(fields[11]) + int(fields[12])
+            rss_pages[pid] = int(fields[21])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    root = os.getpid()
+    child_rss = child_cpu = 0
+    for pid in parents:
+        current = pid
+        while current in parents and current != root:
+            current = parents[current]
+        if current == root and pid != root:
+            child_rss += rss_pages.get(pid, 0)
+            child_cpu += cpu_ticks.get(pid, 0)
+    return rss_pages.get(root, 0) * page_size, child_rss * page_size, child_cpu / ticks
+
+
+class ResourceSampler(threading.Thread):
+    """チェック中のRSSを一定間隔で測り、ピークを記録するスレッド。"""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_self = 0
+        self.peak_children = 0
+        self.cpu = 0.0
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        self_rss, child_rss, _ = _process_tree_stats()
+        self.peak_self = max(self.peak_self, self_rss)
+        self.peak_children = max(self.peak_children, child_rss)
+
+    def run(self):
+        self.sample()
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+        self.sample()
+        # サンプリング自体のCPU時間は計測結果から差し引く
+        self.cpu = time.thread_time()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ---------------------------------------------------------------------- bot stubs
+
+class ReplayChannel:
+    """送信内容を記録するだけのチャンネル。"""
+
+    def __init__(self, channel_id: int, latency: float):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent.append(content)
+
+
+class ReplayBot:
+    def __init__(self, channels: dict[int, ReplayChannel]):
+        self.channels = channels
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def wait_until_ready(self):
+        pass
+
+
+# ---------------------------------------------------------------------- replay
+
+def _mb(value: int) -> float:
+    return value / 1024 / 1024
+
+
+async def replay(args) -> list[dict]:
+    scenario_dir = FIXTURES_DIR / args.scenario
+    scenario = json.loads((scenario_dir / "scenario.json").read_text(encoding="utf-8"))
+    account = scenario["account"]
+
+    server = FixtureServer(scenario_dir)
+    server.start()
+    workdir = Path(tempfile.mkdtemp(prefix="tweet_replay_"))
+
+    channels = {
+        channel_id: ReplayChannel(channel_id, args.send_latency)
+        for channel_id in range(1, args.channels + 1)
+    }
+    (workdir / "subscriptions.json").write_text(json.dumps({account: list(channels)}), encoding="utf-8")
+    (workdir / "sent_tweets.json").write_text(json.dumps(scenario.get("state", {})), encoding="utf-8")
+    config = {
+        "CHANNEL_ID": 1,
+        "TWEET_DEFAULT_ACCOUNT": account,
+        "TWEET_CHECK_INTERVAL_MINUTES": 2,
+        "TWEET_HEDGE_DELAY_SECONDS": args.hedge_delay,
+        "DATA_FILE_TWEETS": str(workdir / "sent_tweets.json"),
+        "DATA_FILE_TWEET_SUBSCRIPTIONS": str(workdir / "subscriptions.json"),
+        "DATA_FILE_TWEET_SOURCES": str(workdir / "sources.json"),
+        "DATA_FILE_TWEET_DELIVERIES": str(workdir / "deliveries.json"),
+        "TWEET_NITTER_URL": f"{server.base_url}/nitter",
+        "TWEET_X_URL": f"{server.base_url}/x",
+        "TWEET_VXTWITTER_URL": f"{server.base_url}/vx",
+        "TWEET_SYNDICATION_URL": f"{server.base_url}/syndication/srv/timeline-profile/screen-name/{{username}}",
+    }
+    config_path = workdir / "config.json"
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+    tweet_cog.CONFIG_PATH = str(config_path)
+
+    cog = tweet_cog.TweetCog(ReplayBot(channels))
+    # 定期実行は止め、チェックはこちらから1回ずつ呼ぶ
+    cog.fetch_tweets_task.cancel()
+    if args.sources:
+        keys = set(args.sources.split(","))
+        all_sources = cog._tweet_sources
+        cog._tweet_sources = lambda: [source for source in all_sources() if source["key"] in keys]
+
+    results = []
+    try:
+        for tick, snapshot in enumerate(scenario["ticks"] * args.repeat, 1):
+            server.use_snapshot(snapshot)
+            sent_before = sum(len(channel.sent) for channel in channels.values())
+            launches_before = cog.browser_pool.launch_count
+            _, _, child_cpu_before = _process_tree_stats()
+
+            sampler = ResourceSampler()
+            sampler.start()
+            output = io.StringIO()
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(output if args.quiet else sys.stdout):
+                if args.mode == "latest":
+                    tweet_ids = await cog.get_latest_tweet_ids(account, args.count)
+                else:
+                    await cog.fetch_tweets_task()
+                    tweet_ids = cog.timelines.get(account, {}).get("ids", [])
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            sampler.stop()
+            _, _, child_cpu_after = _process_tree_stats()
+
+            results.append({
+                "tick": tick,
+                "snapshot": snapshot,
+                "wall": wall,
+                "cpu": max(cpu - sampler.cpu, 0.0),
+                "browser_cpu": child_cpu_after - child_cpu_before,
+                "peak_rss_mb": _mb(sampler.peak_self),
+                "peak_browser_rss_mb": _mb(sampler.peak_children),
+                "browser_launches": cog.browser_pool.launch_count - launches_before,
+                "tweet_ids": len(tweet_ids),
+                "sent": sum(len(channel.sent) for channel in channels.values()) - sent_before,
+                "requests": dict(server.requests),
+            })
+    finally:
+        with contextlib.redirect_stdout(io.StringIO() if args.quiet else sys.stdout):
+            await cog.cog_unload()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_report(results: list[dict], args):
+    print(f"シナリオ: {args.scenario} / モード: {args.mode} / チャンネル数: {args.channels}")
+    header = (
+        f"{'tick':>4} {'snap':>6} {'wall(s)':>8} {'cpu(s)':>7} {'br.cpu':>7} "
+        f"{'rss(MB)':>8} {'br.rss':>8} {'launch':>6} {'ids':>4} {'sent':>5}  requests"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        requests = ", ".join(f"{name.split('.')[0]}={count}" for name, count in sorted(row["requests"].items()))
+        print(
+            f"{row['tick']:>4} {row['snapshot']:>6} {row['wall']:>8.3f} {row['cpu']:>7.3f} "
+            f"{row['browser_cpu']:>7.2f} {row['peak_rss_mb']:>8.1f} {row['peak_browser_rss_mb']:>8.1f} "
+            f"{row['browser_launches']:>6} {row['tweet_ids']:>4} {row['sent']:>5}  {requests}"
+        )
+    print("-" * len(header))
+    walls = [row["wall"] for row in results]
+    print(
+        f"実時間 中央値 {statistics.median(walls):.3f}s / 最大 {max(walls):.3f}s, "
+        f"CPU 合計 {sum(row['cpu'] for row in results):.3f}s "
+        f"(ブラウザ {sum(row['browser_cpu'] for row in results):.2f}s), "
+        f"ピークRSS {max(row['peak_rss_mb'] for row in results):.1f}MB "
+        f"(ブラウザ {max(row['peak_browser_rss_mb'] for row in results):.1f}MB), "
+        f"ブラウザ起動 {sum(row['browser_launches'] for row in results)}回"
+    )
+
+
+# ---------------------------------------------------------------------- record
+
+async def record(args):
+    """実サイトから現在の内容を取得し、スナップショットとして保存する。"""
+    import aiohttp
+    from cogs._browser_pool import BrowserPool
+    from cogs._feed_client import DEFAULT_HEADERS
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    account = args.account
+
+    http_targets = {
+        "nitter_rss.xml": f"https://nitter.net/{account}/rss",
+        "nitter_page.html": f"https://nitter.net/{account}",
+        "syndication.html": f"https://syndication.twitter.com/srv/timeline-profile/screen-name/{account}",
+    }
+    async with aiohttp.ClientSession(headers=DEFAULT_HEADERS) as session:
+        for name, url in http_targets.items():
+            try:
+                async with session.get(url) as response:
+                    body = await response.read()
+                    if response.status == 200:
+                        (out / name).write_bytes(body)
+                    print(f"{name}: HTTP {response.status} ({len(body)} bytes)")
+            except aiohttp.ClientError as e:
+                print(f"{name}: 取得エラー {e}")
+
+    browser_targets = {
+        "x_profile.html": f"https://x.com/{account}",
+        "x_search.html": f"https://x.com/search?q=from%3A{account}%20-filter%3Areplies&src=typed_query&f=live",
+        "vxtwitter.html": f"https://vxtwitter.com/{account}",
+    }
+    pool = BrowserPool()
+    try:
+        for name, url in browser_targets.items():
+            async with pool.lease(viewport={"width": 1920, "height": 1080}) as context:
+                page = await context.new_page()
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                    await page.wait_for_selector('a[href*="/status/"]', timeout=15000)
+                except Exception as e:
+                    print(f"{name}: 待機エラー {e}")
+                # 再生時に外部へ通信しないよう、スクリプトを除いた描画後のDOMを保存する
+                html = await page.evaluate(
+                    "() => { document.querySelectorAll('script, link[rel=preload]').forEach(e => e.remove());"
+                    " return '<!DOCTYPE html>' + document.documentElement.outerHTML; }"
+                )
+                (out / name).write_text(html, encoding="utf-8")
+                print(f"{name}: {len(html)} chars")
+    finally:
+        await pool.close()
+
+
+# ---------------------------------------------------------------------- main
+
+def main():
+    parser = argparse.ArgumentParser(description="TweetCog のオフライン再生ベンチマーク")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="スナップショットを再生して計測する")
+    run_parser.add_argument("--scenario", default="default", help="fixtures/tweet_replay 以下のシナリオ名")
+    run_parser.add_argument("--mode", choices=["tick", "latest"], default="tick",
+                            help="tick: fetch_tweets_task / latest: get_latest_tweet_ids")
+    run_parser.add_argument("--count", type=int, default=10, help="latest モードの取得件数")
+    run_parser.add_argument("--sources", help="使う取得元のキー（カンマ区切り、省略時は全て）")
+    run_parser.add_argument("--channels", type=int, default=1, help="通知先チャンネル数")
+    run_parser.add_argument("--send-latency", type=float, default=0.05, help="1回の送信にかかる秒数")
+    run_parser.add_argument("--hedge-delay", type=float, default=5, help="TWEET_HEDGE_DELAY_SECONDS")
+    run_parser.add_argument("--repeat", type=int, default=1, help="シナリオを繰り返す回数")
+    run_parser.add_argument("--json", help="結果を保存するJSONファイル")
+    run_parser.add_argument("-v", "--verbose", dest="quiet", action="store_false",
+                            help="TweetCog のログを表示する")
+
+    record_parser = subparsers.add_parser("record", help="実サイトからスナップショットを記録する")
+    record_parser.add_argument("account", help="Xのユーザー名")
+    record_parser.add_argument("out", help="保存先ディレクトリ（例: tools/fixtures/tweet_replay/live/s1）")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args))
+        return
+
+    results = asyncio.run(replay(args))
+    print_report(results, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()